@@ -5,14 +5,35 @@ import os
 from streamlit_agraph import agraph, Node, Edge, Config
 
 from brain_manager import BrainManager
-from translator import LanguageTranslator
 from architect import DevelopmentArchitect
 from code_indexer import CodebaseIndexer
-from rag_agent import AgenticBrain
+from index_daemon import LiveIndexDaemon
+from resource_cache import ResourceCache
+from rag_agent import AgenticBrain, TokenTimer
+from telemetry import TELEMETRY
 
 from graph_manager import CodeGraphManager
-from langchain_community.embeddings import HuggingFaceBgeEmbeddings
-from langchain_community.vectorstores import Chroma
+
+@st.cache_resource
+def get_resource_cache(base_url, db_path, keep_alive):
+    """
+    임베딩 모델, 벡터 DB 연결, 워크플로우 보관소. 새로고침(rerun)이나 다른 세션에서도 같은 보관소를 공유함
+    """
+    return ResourceCache(base_url, translation_cache_path= os.path.join(db_path, "translation_cache.sqlite3"), keep_alive= keep_alive)
+
+@st.cache_resource
+def get_brain_manager(base_url, keep_alive):
+    """
+    Ollama 모델 관리자. 새로고침(rerun)마다 모델 목록을 다시 묻지 않도록 HTTP 연결과 목록 캐시를 공유함
+    """
+    return BrainManager(base_url, keep_alive= keep_alive)
+
+@st.cache_resource
+def get_live_daemons():
+    """
+    실시간 동기화 데몬 목록. 새로고침(rerun)이나 다른 세션에서도 같은 목록을 공유함
+    """
+    return {}
 
 class CodeAssistantUI:
     """
@@ -25,18 +46,22 @@ class CodeAssistantUI:
         self.DB_PATH = "./chroma_db"
         self.EMBED_MODEL = "BAAI/bge-small-en-v1.5"
         self.NEO4J_URI = "bolt://localhost:7687"        # Neo4j 주소
+        self.KEEP_ALIVE = "30m"                         # 마지막 요청 뒤 모델을 메모리에 남겨 둘 시간
+        # 관계 그래프 저장소. 서버 없이 한 대에서 쓸 때는 SQLite 파일, 여럿이 같은 그래프를 볼 때는 self.NEO4J_URI
+        self.GRAPH_URI = "sqlite://" + os.path.join(self.DB_PATH, "code_graph.sqlite3")
 
-        self.brain_mgr = BrainManager(self.OLLAMA_URL)
+        self.resources = get_resource_cache(self.OLLAMA_URL, self.DB_PATH, self.KEEP_ALIVE)
+        self.brain_mgr = get_brain_manager(self.OLLAMA_URL, self.KEEP_ALIVE)
         self.architect = DevelopmentArchitect()
-        self.graph_mgr = CodeGraphManager(self.NEO4J_URI, "neo4j", "password")
+        self.graph_mgr = CodeGraphManager(self.GRAPH_URI, "neo4j", "password")
 
     def show_graph_viz(self, file_name):
         """
-        Neo4j 데이터를 읽어와서 특정 파일의 영향 범위를 그래프 그림으로 보여줌
+        그래프 DB 데이터를 읽어와서 특정 파일의 영향 범위를 그래프 그림으로 보여줌
         """
         st.subheader(f"'{file_name}' 관련 의존성 지도")
 
-        # Neo4j에서 관계 데이터를 가져옴
+        # 그래프 DB에서 관계 데이터를 가져옴
         relations = self.graph_mgr.get_context_map(file_name)
 
         nodes = []
@@ -47,12 +72,15 @@ class CodeAssistantUI:
 
         for rel in relations:
             parts = rel.split(" --")
-            neighbor = parts[1].split("-- ")[1]
+            source = parts[0]
+            target = parts[1].split("-- ")[1]
             rel_type = parts[1].split("(")[1].split(")")[0]
+            neighbor = target if source == file_name else source
 
-            # 이웃 점과 연결 선을 추가합니다.
-            nodes.append(Node(id= neighbor, label= neighbor, size= 15, color="#11CAA0"))
-            edges.append(Edge(source= file_name, target= neighbor, label= rel_type))
+            # 이웃 점과 연결 선을 추가합니다. (선은 저장된 방향 그대로 그림)
+            if all(n.id != neighbor for n in nodes):
+                nodes.append(Node(id= neighbor, label= neighbor, size= 15, color="#11CAA0"))
+            edges.append(Edge(source= source, target= target, label= rel_type))
         
         # 그래프 설정
         config = Config(width= 800, height= 400, directed= True, nodeHighlightBehavior= True, highlightColor= "#F3F0DF", collapsible= True)
@@ -60,6 +88,37 @@ class CodeAssistantUI:
         # 화면에 그래프를 그림
         agraph(nodes= nodes, edges= edges, config= config)
 
+    def show_model_state(self, model_name):
+        """선택한 모델의 불러오기 상태와 걸린 시간, 문맥 길이를 보여줌"""
+        state = self.brain_mgr.load_state(model_name)
+        info = self.brain_mgr.get_model_info(model_name)
+        size = f" · {info['size'] / 1024 ** 3:.1f}GB" if info.get("size") else ""
+        if state["state"] == "ready":
+            st.caption(f"✅ 모델 준비됨 (불러오기 {state['seconds']}초) · 문맥 {info['num_ctx']} 토큰{size}")
+        elif state["state"] == "loading":
+            st.caption(f"⏳ 모델 불러오는 중... · 문맥 {info['num_ctx']} 토큰{size}")
+        elif state["state"] == "error":
+            st.caption(f"⚠️ 모델 불러오기 실패: {state['error']}")
+
+    def show_metrics_panel(self):
+        """
+        번역, 워크플로우 단계, 벡터 DB 열기, 학습 단계별 소요 시간과 토큰/청크 수, 캐시 적중을 보여줌
+        대시보드용 Prometheus 텍스트와 JSON lines 로 내려받거나 DB 폴더에 저장할 수 있음
+        """
+        with st.expander("📊 단계별 성능 지표"):
+            summary = TELEMETRY.summary()
+            if not summary:
+                st.caption("아직 기록된 지표가 없습니다.")
+                return
+            st.dataframe(summary, hide_index= True)
+            st.caption("최근 기록")
+            st.dataframe([{"span": s["name"], "ms": s["duration_ms"], **s["attrs"]} for s in TELEMETRY.recent_spans(20)], hide_index= True)
+            st.download_button("Prometheus 텍스트", TELEMETRY.to_prometheus(), file_name= "metrics.prom", mime= "text/plain")
+            st.download_button("JSON lines", TELEMETRY.to_jsonl(), file_name= "spans.jsonl", mime= "application/x-ndjson")
+            if st.button("DB 폴더에 저장"):
+                paths = TELEMETRY.export(os.path.join(self.DB_PATH, "telemetry"))
+                st.toast(f"저장 완료: {', '.join(paths.values())}")
+
     def run(self):
         """웹 화면을 구성하고 프로그램을 실행함"""
         st.set_page_config(page_title= "GrowCode", layout= "wide")
@@ -77,6 +136,10 @@ class CodeAssistantUI:
             # 내 컴퓨터의 Ollama 모델 목록을 가져옴
             models = self.brain_mgr.get_available_models()
             selected_model = st.selectbox("사용할 모델 선택", models if models else ["모델을 찾을 수 없음"])
+            if models:
+                # 고른 모델을 백그라운드에서 미리 불러와서 첫 질문이 모델 로딩을 기다리지 않게 함
+                self.brain_mgr.warm_up(selected_model)
+                self.show_model_state(selected_model)
 
             # 답변 받을 언어 선택
             selected_lang = st.selectbox("답변 언어 선택", ["Korean", "English", "Japanese", "Chinese"])
@@ -87,39 +150,38 @@ class CodeAssistantUI:
             st.divider()
             if st.button("그래프 DB 초기화"):
                 self.graph_mgr.reset_graph()
-                st.toast("Neo4j 데이터가 초기화되었습니다.")
-            
-            # 메인 화면: 2분할 (왼쪽: 채팅/시각화, 오른쪽: 코드 리뷰)
-            col_chat, col_review = st.columns([1, 1])
-
-            with col_chat:
-                st.subheader("GrowCode")
-                if "messages" not in st.session_state: st.session_state.messages = []
-                for msg in st.session_state.messages:
-                    with st.chat_message(msg["role"]): st.markdown(msg["content"])
-                
-                if prompt := st.chat_input("작업을 지시하세요"):
-                    st.session_state.messages.append({"role": "user", "content": prompt})
-                    st.rerun()
-            
-            # 질문이 새로 들어왔을 때의 처리 로직
-            if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-                user_prompt = st.session_state.messages[-1]["content"]
-
-                # 1. 번역 및 검색 준비
-                translator = LanguageTranslator(selected_model, self.OLLAMA_URL)
-                en_query = translator.translate(user_prompt, "English")
-
-                db_dir = os.path.join(self.DB_PATH, st.session_state.user_id, "default_project")
-                if os.path.exists(db_dir):
+                st.toast("그래프 데이터가 초기화되었습니다.")
 
             st.subheader("프로젝트 지식 추가")
             p_name = st.text_input("프로젝트 별명")
             p_path = st.text_input("폴더 실제 경로")
             if st.button("지식 저장 시작"):
-                indexer = CodebaseIndexer(self.DB_ROOT, self.EMBED_MODEL)
-                count = indexer.index_project(p_path, st.session_state.user_id, p_name)
-                st.success(f"{count} 개의 지식 조각 저장 완료")
+                indexer = CodebaseIndexer(self.DB_PATH, self.EMBED_MODEL, graph_uri= self.GRAPH_URI,
+                                          embeddings= self.resources.get_embeddings(self.EMBED_MODEL))
+                stats = indexer.index_project(p_path, st.session_state.user_id, p_name)
+                self.resources.drop_vector_store(st.session_state.user_id, p_name)
+                st.success(f"{stats['embedded_chunks']} 개의 지식 조각 저장 완료")
+                st.caption(f"추가 {stats['added']} · 수정 {stats['modified']} · 삭제 {stats['removed']} · 변경 없음 {stats['skipped']} (전체 {stats['scanned']} 파일)")
+                st.caption(f"{stats['elapsed_sec']}초 · {stats['files_per_sec']} 파일/초 · {stats['chunks_per_sec']} 청크/초")
+
+            # 실시간 동기화: 폴더를 지켜보다가 바뀐 파일만 백그라운드에서 다시 학습함
+            daemons = get_live_daemons()
+            daemon_key = (st.session_state.user_id, p_name)
+            daemon = daemons.get(daemon_key)
+            live = st.toggle("실시간 동기화", value= bool(daemon and daemon.is_running()), disabled= not (p_name and p_path))
+            if live and not (daemon and daemon.is_running()):
+                indexer = CodebaseIndexer(self.DB_PATH, self.EMBED_MODEL, graph_uri= self.GRAPH_URI,
+                                          embeddings= self.resources.get_embeddings(self.EMBED_MODEL))
+                daemon = LiveIndexDaemon(indexer, p_path, st.session_state.user_id, p_name)
+                daemon.start()
+                daemons[daemon_key] = daemon
+            elif not live and daemon:
+                daemon.stop()
+                daemons.pop(daemon_key, None)
+            if daemon and daemon.last_error:
+                st.warning(f"동기화 오류: {daemon.last_error}")
+            elif daemon and daemon.last_stats:
+                st.caption(f"마지막 동기화: {len(daemon.last_stats['changed_files'])} 개 파일 반영")
 
         # 3. 채팅 화면
         if "messages" not in st.session_state: st.session_state.messages = []
@@ -134,42 +196,61 @@ class CodeAssistantUI:
             # AI가 답변을 준비하는 과정
             with st.chat_message("assistant"):
                 # (1) 번역 준비: 사용자 질문을 영어로 번역
-                translator = LanguageTranslator(selected_model, self.OLLAMA_URL)
-                en_query = translator.translate(prompt, "English")
+                translator = self.resources.get_translator(selected_model)
+                en_query = translator.translate(prompt, "English", limiter= self.resources.limiter)
                 st.caption(f"추론용 번역: {en_query}")
 
                 # (2) DB 연결: 지정된 지식을 찾을 준비
                 db_dir = os.path.join(self.DB_PATH, st.session_state.user_id, "default_project")        # 예시 default_project
                 if os.path.exists(db_dir):
-                    embed_ai = HuggingFaceBgeEmbeddings(model_name= self.EMBED_MODEL)
-                    vector_db = Chroma(persist_directory= db_dir, embedding_function=embed_ai)
-                    retriever = vector_db.as_retriever(search_kwargs= {"k": 5})
+                    # 임베딩 모델과 DB 연결은 보관소에서 꺼내 씀 (질문마다 모델을 다시 불러오지 않음)
+                    # 벡터 검색 + 단어 검색(BM25) + 관련 파일 확장 + 재순위를 거친 5개 조각만 AI에게 전달
+                    retriever = self.resources.get_retriever(st.session_state.user_id, "default_project", db_dir, self.EMBED_MODEL, k= 5)
 
                     # (3) 에이전트 실행: 질문에 답하기 위한 지식 검색 및 추론
-                    brain = AgenticBrain(selected_model, self.OLLAMA_URL, retriever)
-                    flow = brain.build_workflow()
+                    flow = self.resources.get_workflow(selected_model)
 
                     # 설계자로부터 해당 기술에 맞는 전문 지침을 가져옴
                     sys_prompt = self.architect.get_system_prompt(selected_stack)
 
-                    with st.spinner("생각하는 중"):
-                        # 사고 흐름 실행
-                        final_state = flow.invoke({
-                            "question": en_query,
-                            "system_prompt": sys_prompt,
-                            "stack": selected_stack
-                        })
-                        en_answer = final_state["answer"]
-
-                        # (4) 재번역: AI의 답변을 사용자 언어로 번역
-                        final_answer = translator.translate(en_answer, selected_lang)
-                        st.markdown(final_answer)
-
-                        # 대화 기록에 저장
-                        st.session_state.messages.append({"role": "assistant", "content": final_answer})
+                    # 사고 흐름 실행: 답변 토큰이 생성되는 대로 화면에 바로 그려줌
+                    inputs = {
+                        "question": en_query,
+                        "system_prompt": sys_prompt,
+                        "stack": selected_stack
+                    }
+                    timer = TokenTimer()
+                    answer_cache = self.resources.get_answer_cache(self.EMBED_MODEL)
+                    tokens = AgenticBrain.stream_answer(flow, inputs, config= {"configurable": {
+                        "retriever": retriever,
+                        # "누가 X를 호출하지?" 같은 탐색 질문은 심볼 색인으로 바로 답하고, 질문에 나온 심볼의 정의를 문맥에 넣음
+                        "symbol_index": self.resources.get_symbol_index(st.session_state.user_id, "default_project", db_dir),
+                        "limiter": self.resources.limiter,
+                        # 같은 사용자/프로젝트/모델/스택 안에서 비슷한 질문이면 이전 답변을 재사용 (참고 파일이 바뀌면 무효)
+                        "answer_cache": answer_cache,
+                        "cache_scope": (st.session_state.user_id, "default_project", selected_model, selected_stack),
+                        "manifest_dir": db_dir,
+                        # 모델의 실제 문맥 길이에 맞춰 검색 결과를 담음
+                        "context_length": self.brain_mgr.get_model_info(selected_model)["num_ctx"],
+                    }}, timer= timer)
+
+                    # (4) 재번역: 영어가 아닌 언어를 골랐다면 문장이 끝날 때마다 번역해서 이어 붙임
+                    # 번역을 거친 뒤 화면에 첫 글자가 보인 시각도 함께 잼 (사용자가 실제로 기다린 시간)
+                    final_answer = st.write_stream(timer.watch(translator.translate_stream(tokens, selected_lang, limiter= self.resources.limiter)))
+                    timer.finish()
+                    if timer.ttft is not None:
+                        visible = f"화면 첫 글자 {timer.ttfv:.2f}초 · " if timer.ttfv is not None else ""
+                        st.caption(f"첫 토큰 {timer.ttft:.2f}초 · {visible}전체 {timer.total:.2f}초 · 캐시 적중률 {answer_cache.hit_rate():.0%}")
+
+                    # 대화 기록에 저장
+                    st.session_state.messages.append({"role": "assistant", "content": final_answer})
                 else:
                     st.error("학습된 프로젝트가 없습니다. 사이드바에서 먼저 학습시켜주세요.")
 
+        # 이번 질문까지 반영된 지표를 보여주도록 사이드바 맨 아래에 마지막으로 그림
+        with st.sidebar:
+            self.show_metrics_panel()
+
 if __name__ == "__main__":
     app = CodeAssistantUI()
     app.run()
\ No newline at end of file
@@ -0,0 +1,69 @@
+# 번역 → 검색 → 답변 → 재번역 과정을 비동기로 실행해서, 서로 기다릴 필요 없는 단계를 겹쳐 처리하는 파일입니다.
+
+import time
+import asyncio
+
+from concurrency import ModelConcurrencyLimiter
+from rag_agent import merge_documents
+
+
+class AsyncQuestionPipeline:
+    """
+    질문 하나를 비동기로 처리하는 클래스
+    - 질문을 영어로 번역하는 동안, 원래 질문으로 먼저 검색을 시작해 둡니다.
+    - 여러 검색기는 동시에 실행하고 결과를 합칩니다.
+    - 모델 호출은 모델별 동시 요청 한도(limiter) 안에서만 실행해서, 여러 사용자가 같은 Ollama 서버를 나눠 씁니다.
+    """
+    def __init__(self, resources, limiter=None, answer_cache=None):
+        self.resources = resources
+        self.limiter = limiter or ModelConcurrencyLimiter()
+        self.answer_cache = answer_cache
+
+    async def _retrieve_all(self, retrievers, query):
+        results = await asyncio.gather(*[r.ainvoke(query) for r in retrievers])
+        return merge_documents(*results)
+
+    async def answer(self, question, model_name, answer_lang, stack, system_prompt, retrievers, cache_scope=None, manifest_dir=None, symbol_index=None, context_length=None):
+        """
+        질문 하나에 대한 답변과 단계별 소요 시간을 돌려줍니다.
+        answer_cache가 있으면 cache_scope 범위 안에서 비슷한 질문의 답변을 재사용합니다.
+        symbol_index가 있으면 코드 탐색 질문은 AI 호출 없이 색인으로 답합니다.
+        context_length를 주면 그 길이에 맞춰 검색 결과를 담습니다. (모델의 실제 문맥 길이)
+        """
+        timings = {}
+        started = time.perf_counter()
+        translator = self.resources.get_translator(model_name)
+        flow = self.resources.get_workflow(model_name)
+
+        # 1. 번역과 원래 질문 검색을 동시에 시작
+        translate_task = asyncio.create_task(translator.atranslate(question, "English", limiter=self.limiter))
+        prefetch_task = asyncio.create_task(self._retrieve_all(retrievers, question))
+        en_query = await translate_task
+        timings["translate_in"] = time.perf_counter() - started
+        prefetched = await prefetch_task
+        timings["prefetch"] = time.perf_counter() - started
+
+        # 2. 번역된 질문으로 검색(미리 찾은 결과와 합침)하고 답변 작성
+        state = await flow.ainvoke({
+            "question": en_query,
+            "system_prompt": system_prompt,
+            "stack": stack,
+            "prefetched": prefetched,
+            "prefetched_for": question,
+        }, config={"configurable": {
+            "retrievers": retrievers,
+            "symbol_index": symbol_index,
+            "limiter": self.limiter,
+            "answer_cache": self.answer_cache,
+            "cache_scope": cache_scope,
+            "manifest_dir": manifest_dir,
+            "context_length": context_length,
+        }})
+        timings["workflow"] = time.perf_counter() - started
+
+        # 3. 답변을 사용자 언어로 재번역
+        final_answer = await translator.atranslate(state["answer"], answer_lang, limiter=self.limiter)
+        timings["total"] = time.perf_counter() - started
+
+        return {"en_query": en_query, "en_answer": state["answer"], "answer": final_answer,
+                "cache_hit": bool(state.get("cache_hit")), "timings": timings}
@@ -0,0 +1,245 @@
+# 학습/그래프/검색/답변 단계가 얼마나 빠른지 재는 벤치마크 파일입니다.
+# 가짜 프로젝트를 만들고, Ollama/임베딩 모델/Neo4j 대신 항상 같은 결과를 내는 대역을 써서 인터넷 없이 돌아갑니다.
+#
+# 사용법: python benchmark.py --files 300 --out bench.json
+# 결과 JSON 두 개를 비교하면 어떤 변경이 어느 단계를 빠르게(느리게) 했는지 알 수 있습니다.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_community.vectorstores import Chroma
+
+from code_indexer import CodebaseIndexer
+from graph_builder import CodeGraphBuiler
+from compact_graph import CompactGraph
+from retrieval_engine import HybridRetriever, LexicalIndex
+from symbol_index import SymbolIndex
+from rag_agent import AgenticBrain
+
+LANGUAGES = ("py", "js", "md")
+
+
+# ---------- 가짜 프로젝트 만들기 ----------
+def _python_module(rng, index, package, modules, imports_per_file):
+    """다른 모듈을 import 하고 그 클래스를 호출하는 파이썬 모듈 하나"""
+    lines = [f'"""Synthetic module {index}."""', "import os"]
+    calls = []
+    for other, other_package in rng.sample(modules, min(imports_per_file, len(modules))):
+        if other == index:
+            continue
+        if other_package == package:
+            lines.append(f"from . import mod_{other}")
+            calls.append(f"mod_{other}.Class{other}(n).method_0(n)")
+        else:
+            lines.append(f"from pkg_{other_package}.mod_{other} import Class{other}")
+            calls.append(f"Class{other}(n).method_0(n)")
+    lines += ["", f"CONSTANT_{index} = {index}", "", "",
+              f"def helper_{index}(n):",
+              f"    return n * CONSTANT_{index} + len(os.sep)", "", "",
+              f"class Class{index}:",
+              f'    """Synthetic class {index} used by other modules."""',
+              "    def __init__(self, value):",
+              "        self.value = value", ""]
+    for m in range(rng.randint(2, 5)):
+        lines += [f"    def method_{m}(self, x):",
+                  "        total = 0",
+                  "        for n in range(x):",
+                  f"            total += helper_{index}(n)"]
+        if calls and m == 1:
+            lines.append(f"            total += {rng.choice(calls)}")
+        lines += ["        return total + self.value", ""]
+    return "\n".join(lines) + "\n"
+
+
+def _js_module(rng, index):
+    functions = []
+    for f in range(rng.randint(2, 5)):
+        functions.append(f"function handler{index}_{f}(event) {{\n"
+                         f"  const value = event.detail * {f + 1};\n"
+                         f"  return value + {rng.randint(0, 100)};\n"
+                         f"}}\n")
+    return "\n".join(functions)
+
+
+def _markdown(rng, index):
+    words = ["index", "graph", "query", "answer", "module", "cache", "vector", "token", "stream", "project"]
+    paragraphs = [" ".join(rng.choice(words) for _ in range(60)) for _ in range(rng.randint(2, 6))]
+    return f"# Document {index}\n\n" + "\n\n".join(paragraphs) + "\n"
+
+
+def generate_project(root_dir, files=200, imports_per_file=4, languages=LANGUAGES, packages=None, seed=0):
+    """
+    크기를 정할 수 있는 가짜 프로젝트를 만듭니다. 같은 seed면 항상 같은 프로젝트가 나옵니다.
+    파이썬 파일은 packages 개의 패키지에 나뉘어 들어가고, 절대/상대 import 로 서로를 참조합니다.
+    """
+    rng = random.Random(seed)
+    packages = packages or max(1, files // 25)
+    per_language = {lang: 0 for lang in languages}
+    for i in range(files):
+        per_language[languages[i % len(languages)]] += 1
+
+    py_modules = [(i, i % packages) for i in range(per_language.get("py", 0))]
+    for p in range(packages if py_modules else 0):
+        os.makedirs(os.path.join(root_dir, f"pkg_{p}"), exist_ok=True)
+        with open(os.path.join(root_dir, f"pkg_{p}", "__init__.py"), "w", encoding="utf-8") as f:
+            f.write(f'"""Synthetic package {p}."""\n')
+    for index, package in py_modules:
+        with open(os.path.join(root_dir, f"pkg_{package}", f"mod_{index}.py"), "w", encoding="utf-8") as f:
+            f.write(_python_module(rng, index, package, py_modules, imports_per_file))
+
+    for lang, folder, make in (("js", "web", _js_module), ("md", "docs", _markdown)):
+        if per_language.get(lang):
+            os.makedirs(os.path.join(root_dir, folder), exist_ok=True)
+        for index in range(per_language.get(lang, 0)):
+            with open(os.path.join(root_dir, folder, f"file_{index}.{lang}"), "w", encoding="utf-8") as f:
+                f.write(make(rng, index))
+    return per_language
+
+
+# ---------- 측정 ----------
+class BenchmarkRecorder:
+    """단계별 소요 시간(초)과 파이썬 힙의 최대 사용량(MB, tracemalloc 기준)을 기록합니다."""
+    def __init__(self):
+        self.results = {}
+
+    def measure(self, name, fn, *args, **kwargs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            value = fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.results[name] = {"seconds": round(elapsed, 4), "peak_mb": round(peak / 1024 ** 2, 2)}
+        print(f"{name:<28} {elapsed:8.3f}초  {peak / 1024 ** 2:8.1f}MB")
+        return value
+
+    def note(self, name, **values):
+        """측정값 외에 함께 남길 숫자(파일 수, 청크 수 등)"""
+        self.results.setdefault(name, {}).update(values)
+
+
+def _touch(root_dir, rel_paths):
+    """파일 내용을 조금 바꿔서 증분 학습 대상으로 만듦"""
+    for rel_path in rel_paths:
+        with open(os.path.join(root_dir, rel_path), "a", encoding="utf-8") as f:
+            f.write("\n# touched by benchmark\n")
+
+
+def run_benchmark(work_dir, files=200, imports_per_file=4, languages=LANGUAGES, questions=20, seed=0, embed_size=384):
+    recorder = BenchmarkRecorder()
+    root_dir = os.path.join(work_dir, "project")
+    db_path = os.path.join(work_dir, "db")
+    os.makedirs(root_dir, exist_ok=True)
+
+    counts = recorder.measure("generate_project", generate_project, root_dir, files, imports_per_file, languages, seed=seed)
+    recorder.note("generate_project", files=counts)
+
+    # 1. 학습: 처음 전체 학습 → 바뀐 것 없는 재학습 → 일부만 바꾼 증분 학습
+    embeddings = DeterministicFakeEmbedding(size=embed_size)
+    indexer = CodebaseIndexer(db_path, "fake-embedding", embeddings=embeddings, graph_uri="sqlite://:memory:")
+    stats = recorder.measure("index_project.cold", indexer.index_project, root_dir, "bench", "project")
+    recorder.note("index_project.cold", files_per_sec=stats["files_per_sec"], chunks=stats["embedded_chunks"])
+    stats = recorder.measure("index_project.unchanged", indexer.index_project, root_dir, "bench", "project")
+    recorder.note("index_project.unchanged", skipped=stats["skipped"])
+    changed = sorted(os.path.relpath(os.path.join(r, f), root_dir).replace("\\", "/")
+                     for r, _, fs in os.walk(root_dir) for f in fs)[::10]
+    _touch(root_dir, changed)
+    stats = recorder.measure("index_project.incremental", indexer.index_project, root_dir, "bench", "project")
+    recorder.note("index_project.incremental", modified=stats["modified"], chunks=stats["embedded_chunks"])
+
+    # 2. import 그래프: 전체 분석(캐시 없음/있음), pickle 저장/불러오기, 압축 형식 저장/불러오기
+    graph_dir = os.path.join(work_dir, "graph")
+    os.makedirs(graph_dir, exist_ok=True)
+    cache_path = os.path.join(graph_dir, "import_cache.json")
+    builder = CodeGraphBuiler()
+    recorder.measure("build_graph.cold", builder.build_graph, root_dir, cache_path=cache_path)
+    recorder.note("build_graph.cold", nodes=builder.graph.number_of_nodes(), edges=builder.graph.number_of_edges())
+    recorder.measure("build_graph.cached", CodeGraphBuiler().build_graph, root_dir, cache_path=cache_path)
+    pickle_path = os.path.join(graph_dir, "code_graph.pkl")
+    compact_path = os.path.join(graph_dir, "code_graph.cgrf")
+    recorder.measure("graph.save", builder.save, pickle_path)
+    recorder.measure("graph.load", CodeGraphBuiler().load, pickle_path)
+    recorder.measure("graph.save_compact", builder.save_compact, compact_path)
+    compact = CompactGraph()
+    recorder.measure("graph.load_compact", compact.load, compact_path)
+    compact.close()
+
+    # 3. 검색: 벡터 + BM25 + 그래프 확장 (재순위 모델은 내려받아야 하므로 끔)
+    persist_dir = os.path.join(db_path, "bench", "project")
+    lexical = LexicalIndex(persist_dir)
+    lexical.load()
+    vector_db = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
+    retriever = HybridRetriever(vector_db=vector_db, lexical_index=lexical, graph_builder=CompactGraph(),
+                                graph_path=os.path.join(persist_dir, CodebaseIndexer.COMPACT_GRAPH_FILE), k=5, use_reranker=False)
+    rng = random.Random(seed)
+    py_count = counts.get("py", 0) or 1
+    queries = [rng.choice([f"How does Class{rng.randrange(py_count)} compute its total?",
+                           f"What does helper_{rng.randrange(py_count)} return?",
+                           "Which handler reads event.detail?"]) for _ in range(questions)]
+    retriever.invoke(queries[0])        # 첫 호출의 그래프/색인 불러오기는 따로 재지 않음
+    recorder.measure("retrieval", lambda: [retriever.invoke(q) for q in queries])
+    recorder.note("retrieval", queries=len(queries), per_query_ms=round(recorder.results["retrieval"]["seconds"] / len(queries) * 1000, 2))
+
+    # 4. 답변 워크플로우: 가짜 LLM으로 캐시/심볼 탐색/검색/문맥 정리/답변 전체 흐름을 잼
+    symbols = SymbolIndex(persist_dir)
+    symbols.load()
+    llm = FakeListChatModel(responses=["This is a deterministic benchmark answer."])
+    flow = AgenticBrain("fake-llm", None, llm=llm).build_workflow()
+    config = {"configurable": {"retriever": retriever, "symbol_index": symbols}}
+    inputs = [{"question": q, "system_prompt": "You are a benchmark.", "stack": "Python"} for q in queries]
+    recorder.measure("workflow", lambda: [flow.invoke(i, config=config) for i in inputs])
+    recorder.note("workflow", questions=len(inputs), per_question_ms=round(recorder.results["workflow"]["seconds"] / len(inputs) * 1000, 2))
+    navigation = [{"question": f"Who calls helper_{i % py_count}?", "system_prompt": "", "stack": "Python"} for i in range(questions)]
+    recorder.measure("workflow.navigation", lambda: [flow.invoke(i, config=config) for i in navigation])
+    return recorder.results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 프로젝트로 학습/그래프/검색/답변 속도를 재고 JSON으로 저장합니다.")
+    parser.add_argument("--files", type=int, default=200, help="만들 파일 수")
+    parser.add_argument("--imports", type=int, default=4, help="파이썬 파일 하나가 import 하는 모듈 수")
+    parser.add_argument("--languages", default=",".join(LANGUAGES), help="만들 파일 종류 (py,js,md)")
+    parser.add_argument("--questions", type=int, default=20, help="검색/답변 단계에서 던질 질문 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=None, help="가짜 프로젝트와 DB를 만들 폴더 (없으면 임시 폴더를 쓰고 끝나면 지움)")
+    parser.add_argument("--reuse", action="store_true", help="비어 있지 않은 --work-dir 를 그대로 씀 (이전 DB/캐시가 남아 있어 처음 학습 수치가 빨라짐)")
+    parser.add_argument("--out", default="benchmark_results.json", help="결과 JSON 파일")
+    args = parser.parse_args(argv)
+    if args.work_dir and os.path.isdir(args.work_dir) and os.listdir(args.work_dir) and not args.reuse:
+        # 이전 실행의 DB와 import 캐시가 남아 있으면 '처음 학습' 수치가 캐시된 수치가 되므로 막음
+        parser.error(f"--work-dir 가 비어 있지 않습니다: {args.work_dir} (지우고 다시 실행하거나 --reuse 를 주세요)")
+
+    languages = tuple(lang.strip() for lang in args.languages.split(",") if lang.strip() in LANGUAGES)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="growcode-bench-")
+    try:
+        results = run_benchmark(work_dir, args.files, args.imports, languages, args.questions, args.seed)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"files": args.files, "imports": args.imports, "languages": list(languages), "questions": args.questions, "seed": args.seed,
+                   "reused_work_dir": bool(args.work_dir and args.reuse)},
+        "environment": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
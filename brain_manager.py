@@ -1,22 +1,163 @@
 # 로컬에 설치된 Ollama AI 모델들을 관리하고 선택할 수 있게 돕는 파일입니다.
 
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from telemetry import TELEMETRY
 
 class BrainManager:
     """
     내 로컬 컴퓨터의 Ollama 서버에 어떤 모델들이 있는지 확인하고 관리하는 클래스
+    - 연결을 재사용하는 HTTP 세션 하나로 서버와 통신함
+    - 모델 목록과 모델 정보(문맥 길이, 크기)는 cache_ttl 초 동안 기억함
+    - 선택한 모델을 백그라운드에서 미리 불러오고(warm-up), keep_alive 동안 메모리에 남겨 둠
     """
-    def __init__(self, base_url):
+    # 모델 파일에 num_ctx 가 없을 때 Ollama가 실제로 쓰는 문맥 길이
+    DEFAULT_NUM_CTX = 4096
+
+    def __init__(self, base_url, cache_ttl= 30, keep_alive= "30m", timeout= 5):
         self.base_url = base_url
+        self.cache_ttl = cache_ttl
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections= 4, pool_maxsize= 8))
+        self.session.mount("https://", HTTPAdapter(pool_connections= 4, pool_maxsize= 8))
+
+        self._lock = threading.Lock()
+        self._models = None           # (만료 시각, [모델 정보])
+        self._infos = {}              # 모델 이름 -> (만료 시각, 정보)
+        self._load_states = {}        # 모델 이름 -> {"state", "seconds", "error", "since"}
+
+    def _list_models(self):
+        """/api/tags 결과를 TTL 동안 기억해서 돌려줌. 서버에 닿지 않으면 마지막으로 받은 목록을 씀"""
+        now = time.monotonic()
+        with self._lock:
+            if self._models and self._models[0] > now:
+                return self._models[1]
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout= self.timeout)
+            response.raise_for_status()
+            models = response.json().get("models", [])
+        except Exception:
+            with self._lock:
+                return self._models[1] if self._models else []
+        with self._lock:
+            self._models = (now + self.cache_ttl, models)
+        return models
 
     def get_available_models(self):
         """
         Ollama 서버에 접속해서 현재 다운로드되어 있는 모델 목록을 리스트로 가져옴.
         """
+        return [m["name"] for m in self._list_models()]
+
+    def get_model_info(self, model_name):
+        """
+        모델의 문맥 길이와 크기를 /api/show 에서 읽어옴
+        context_length: 모델이 학습한 최대 길이, num_ctx: 실제 요청에 쓰이는 길이 (검색 결과 양을 정할 때 사용)
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._infos.get(model_name)
+            if cached and cached[0] > now:
+                return cached[1]
+
+        info = {"name": model_name, "size": None, "context_length": None, "num_ctx": self.DEFAULT_NUM_CTX,
+                "parameter_size": None, "quantization": None}
+        for m in self._list_models():
+            if m.get("name") == model_name:
+                details = m.get("details") or {}
+                info.update(size= m.get("size"), parameter_size= details.get("parameter_size"), quantization= details.get("quantization_level"))
+        try:
+            response = self.session.post(f"{self.base_url}/api/show", json= {"model": model_name}, timeout= self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            # 서버가 답하지 않아도 cache_ttl 동안은 기본값을 써서, 질문마다 시간 초과를 기다리지 않게 함
+            with self._lock:
+                self._infos[model_name] = (now + self.cache_ttl, info)
+            return info
+
+        for key, value in (data.get("model_info") or {}).items():
+            if key.endswith(".context_length"):
+                info["context_length"] = value
+        # 모델 파일(Modelfile)에 num_ctx 가 있으면 그 값이 실제 문맥 길이
+        num_ctx = None
+        for line in (data.get("parameters") or "").splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == "num_ctx" and parts[1].isdigit():
+                num_ctx = int(parts[1])
+        if num_ctx is None and info["context_length"]:
+            num_ctx = min(info["context_length"], self.DEFAULT_NUM_CTX)
+        info["num_ctx"] = num_ctx or self.DEFAULT_NUM_CTX
+
+        with self._lock:
+            self._infos[model_name] = (now + self.cache_ttl, info)
+        return info
+
+    def loaded_models(self):
+        """지금 Ollama 메모리에 올라가 있는 모델 이름 목록 (/api/ps)"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
-            if response.status_code == 200:
-                return [m['name'] for m in response.json().get('models', [])]
+            response = self.session.get(f"{self.base_url}/api/ps", timeout= self.timeout)
+            response.raise_for_status()
+            return [m["name"] for m in response.json().get("models", [])]
+        except Exception:
             return []
-        except:
-            return []
\ No newline at end of file
+
+    def warm_up(self, model_name, keep_alive= None):
+        """
+        모델을 백그라운드에서 미리 불러옴. 이미 불러오는 중이거나 불러온 모델이면 아무것도 하지 않음
+        첫 질문(번역 + 답변)이 모델을 불러오느라 기다리는 시간을 없앰
+        """
+        with self._lock:
+            state = self._load_states.get(model_name)
+            if state and state["state"] == "loading":
+                return
+            if state and state["state"] in ("ready", "error"):
+                # 불러온 지(또는 실패한 지) 얼마 안 됐으면 넘어감. 실패한 모델도 cache_ttl 이 지나야 다시 시도함
+                if time.time() - state["since"] < self.cache_ttl:
+                    return
+            if state and state["state"] == "ready":
+                # 오래됐으면 keep_alive가 지나 내려갔는지 확인함. 확인하는 동안 다른 호출은 위에서 넘어가도록 시각을 먼저 갱신
+                state["since"] = time.time()
+                check = True
+            else:
+                check = False
+                self._load_states[model_name] = {"state": "loading", "seconds": None, "error": None, "since": time.time()}
+
+        if check:
+            if model_name in self.loaded_models():
+                return
+            with self._lock:
+                # 확인하는 사이에 다른 호출이 이미 불러오기 시작했으면 넘어감
+                if self._load_states[model_name]["state"] != "ready":
+                    return
+                self._load_states[model_name] = {"state": "loading", "seconds": None, "error": None, "since": time.time()}
+        threading.Thread(target= self._load, args= (model_name, keep_alive or self.keep_alive),
+                         name= f"warm-up-{model_name}", daemon= True).start()
+
+    def _load(self, model_name, keep_alive):
+        started = time.perf_counter()
+        try:
+            # 프롬프트 없이 generate 를 부르면 Ollama는 모델만 불러오고 바로 응답함
+            response = self.session.post(f"{self.base_url}/api/generate", json= {"model": model_name, "keep_alive": keep_alive},
+                                         timeout= (self.timeout, 600))
+            response.raise_for_status()
+            load_ns = response.json().get("load_duration")
+            seconds = load_ns / 1e9 if load_ns else time.perf_counter() - started
+            state = {"state": "ready", "seconds": round(seconds, 2), "error": None, "since": time.time()}
+            TELEMETRY.record("model.load", seconds, model= model_name)
+        except Exception as e:
+            state = {"state": "error", "seconds": None, "error": str(e), "since": time.time()}
+        with self._lock:
+            self._load_states[model_name] = state
+
+    def load_state(self, model_name):
+        """
+        모델 불러오기 상태: {"state": idle/loading/ready/error, "seconds": 불러오는 데 걸린 시간, "error": 오류}
+        """
+        with self._lock:
+            return dict(self._load_states.get(model_name) or {"state": "idle", "seconds": None, "error": None, "since": None})
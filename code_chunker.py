@@ -0,0 +1,279 @@
+# 코드를 글자 수가 아니라 함수/클래스/메서드 같은 문법 단위로 잘라서 지식 조각(청크)을 만드는 파일입니다.
+
+import ast
+import re
+from html.parser import HTMLParser
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# 중괄호 { } 로 블록을 구분하는 언어들
+BRACE_LANGUAGES = {".js": "javascript", ".java": "java", ".css": "css"}
+
+# 블록 머리에서 이름을 뽑아내는 규칙 (위에서부터 먼저 맞는 것을 사용)
+HEADER_PATTERNS = [
+    ("class", re.compile(r"\b(?:class|interface|enum|record)\s+([A-Za-z_$][\w$]*)")),
+    ("function", re.compile(r"\bfunction\s*\*?\s*([A-Za-z_$][\w$]*)")),
+    ("function", re.compile(r"\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=")),
+    ("method", re.compile(r"([A-Za-z_$][\w$]*)\s*\([^()]*\)\s*(?:throws\s+[\w.,\s]+)?\{?\s*$")),
+]
+
+# 닫는 태그가 없는 HTML 태그
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr", "!doctype"}
+
+
+class CodeChunker:
+    """
+    파일 하나를 문법 단위의 청크로 나누는 클래스
+    - 파이썬: ast로 함수/클래스/메서드를 찾아 하나씩 청크로 만듭니다.
+    - JS/Java/CSS: 중괄호 짝을 맞춰 블록을 찾습니다.
+    - HTML: 태그 짝을 맞춰 요소를 찾습니다.
+    너무 큰 단위만 안쪽 단위로 더 나누고, 그래도 크면 글자 수 기준으로 자릅니다.
+    """
+    def __init__(self, max_chars=1500):
+        self.max_chars = max_chars
+        self.fallback = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0)
+
+    def split(self, rel_path, text):
+        """파일 내용을 청크(Document) 목록으로 나눕니다."""
+        lines = text.splitlines(keepends=True)
+        ext = "." + rel_path.rsplit(".", 1)[-1].lower() if "." in rel_path else ""
+        units = None
+        try:
+            if ext == ".py":
+                units = self._python_units(text, lines)
+            elif ext in BRACE_LANGUAGES:
+                units = self._brace_units(lines, 0, len(lines), "")
+            elif ext == ".html":
+                units = self._html_units(text, lines)
+        except (SyntaxError, ValueError):
+            units = None        # 문법 오류가 있는 파일은 글자 수 기준으로 자름
+
+        if not units:
+            units = [("module", "", "", 1, len(lines))] if lines else []
+        units = self._fill_gaps(units, lines)
+
+        docs = []
+        for kind, name, parent, start, end in units:
+            body = "".join(lines[start - 1:end])
+            if not body.strip():
+                continue
+            meta = {"source": rel_path, "kind": kind, "qualified_name": name, "parent": parent}
+            docs.extend(self._sized(body, meta, start))
+        return docs
+
+    def _sized(self, body, meta, start):
+        """단위 하나가 너무 크면 글자 수 기준으로 자르되, 각 조각의 줄 범위를 다시 계산합니다."""
+        if len(body) <= self.max_chars:
+            end = start + body.count("\n") - (1 if body.endswith("\n") else 0)
+            return [Document(page_content=body, metadata={**meta, "start_line": start, "end_line": end})]
+        docs = []
+        pos = 0
+        for piece in self.fallback.split_text(body):
+            offset = body.find(piece, pos)
+            if offset == -1:
+                offset = pos
+            piece_start = start + body.count("\n", 0, offset)
+            piece_end = piece_start + piece.count("\n")
+            docs.append(Document(page_content=piece, metadata={**meta, "start_line": piece_start, "end_line": piece_end}))
+            pos = offset + len(piece)
+        return docs
+
+    def _fill_gaps(self, units, lines):
+        """함수/클래스 사이에 남은 줄(import, 상수 등)을 module 청크로 묶어서 빠지는 내용이 없게 합니다."""
+        units = sorted(units, key=lambda u: u[3])
+        filled = []
+        line = 1
+        for unit in units:
+            if unit[3] > line:
+                filled.append(("module", "", "", line, unit[3] - 1))
+            filled.append(unit)
+            line = max(line, unit[4] + 1)
+        if line <= len(lines):
+            filled.append(("module", "", "", line, len(lines)))
+        return filled
+
+    def _span_chars(self, lines, start, end):
+        return sum(len(l) for l in lines[start - 1:end])
+
+    # ---------- 파이썬 ----------
+    def _python_units(self, text, lines):
+        tree = ast.parse(text)
+        units = []
+        self._python_walk(tree.body, "", lines, units)
+        return units
+
+    def _python_walk(self, body, parent, lines, units):
+        for node in body:
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            name = f"{parent}.{node.name}" if parent else node.name
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            end = node.end_lineno
+            kind = "class" if isinstance(node, ast.ClassDef) else ("method" if parent else "function")
+            children = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+            if isinstance(node, ast.ClassDef) and children and self._span_chars(lines, start, end) > self.max_chars:
+                # 큰 클래스는 머리(선언부와 클래스 변수)와 메서드들로 나눔
+                first_child = min(min([c.lineno] + [d.lineno for d in c.decorator_list]) for c in children)
+                units.append((kind, name, parent, start, first_child - 1))
+                inner = []
+                self._python_walk(node.body, name, lines, inner)
+                units.extend(inner)
+                # 메서드 사이에 있는 클래스 본문도 클래스 청크로 남김
+                covered = first_child
+                for unit in sorted(inner, key=lambda u: u[3]):
+                    if unit[3] > covered and "".join(lines[covered - 1:unit[3] - 1]).strip():
+                        units.append((kind, name, parent, covered, unit[3] - 1))
+                    covered = max(covered, unit[4] + 1)
+                if covered <= end and "".join(lines[covered - 1:end]).strip():
+                    units.append((kind, name, parent, covered, end))
+            else:
+                units.append((kind, name, parent, start, end))
+
+    # ---------- 중괄호 언어 (JS / Java / CSS) ----------
+    def _brace_blocks(self, lines, lo, hi):
+        """
+        lines[lo:hi] 안에서 가장 바깥쪽 { } 블록들의 (시작줄, 끝줄) 을 0부터 세는 줄 번호로 찾습니다.
+        문자열과 주석 안의 괄호는 무시합니다.
+        """
+        blocks = []
+        depth = 0
+        stmt_start = None
+        block_start = None
+        in_block_comment = False
+        for i in range(lo, hi):
+            line = lines[i]
+            j = 0
+            quote = None
+            while j < len(line):
+                ch = line[j]
+                nxt = line[j + 1] if j + 1 < len(line) else ""
+                if in_block_comment:
+                    if ch == "*" and nxt == "/":
+                        in_block_comment = False
+                        j += 1
+                elif quote:
+                    if ch == "\\":
+                        j += 1
+                    elif ch == quote:
+                        quote = None
+                elif ch == "/" and nxt == "/":
+                    break
+                elif ch == "/" and nxt == "*":
+                    in_block_comment = True
+                    j += 1
+                elif ch in "\"'`":
+                    quote = ch
+                elif ch == "{":
+                    if depth == 0:
+                        block_start = stmt_start if stmt_start is not None else i
+                    depth += 1
+                elif ch == "}":
+                    depth = max(0, depth - 1)
+                    if depth == 0 and block_start is not None:
+                        blocks.append((block_start, i))
+                        block_start = None
+                        stmt_start = None
+                elif ch == ";" and depth == 0:
+                    stmt_start = None
+                elif depth == 0 and stmt_start is None and not ch.isspace():
+                    stmt_start = i
+                j += 1
+        return blocks
+
+    def _header_name(self, header):
+        header = header.split("{")[0].strip()
+        for kind, pattern in HEADER_PATTERNS:
+            match = pattern.search(header)
+            if match:
+                return kind, match.group(1)
+        return "block", header[:80]
+
+    def _brace_units(self, lines, lo, hi, parent):
+        units = []
+        for start, end in self._brace_blocks(lines, lo, hi):
+            header = "".join(lines[start:start + 3])
+            kind, name = self._header_name(header)
+            if kind == "method" and not parent:
+                kind = "function"
+            qualified = f"{parent}.{name}" if parent and kind != "block" else name
+            if self._span_chars(lines, start + 1, end + 1) > self.max_chars and end - start > 1:
+                # 너무 큰 블록은 안쪽 블록(메서드 등)으로 나누고, 나머지 줄은 블록 자신의 청크로 남김
+                children = sorted(self._brace_units_inner(lines, start, end, qualified), key=lambda u: u[3])
+                if children:
+                    units.append((kind, qualified, parent, start + 1, children[0][3] - 1))
+                    units.extend(children)
+                    covered = children[0][3]
+                    for child in children:
+                        if child[3] > covered and "".join(lines[covered - 1:child[3] - 1]).strip():
+                            units.append((kind, qualified, parent, covered, child[3] - 1))
+                        covered = max(covered, child[4] + 1)
+                    if covered <= end + 1:
+                        units.append((kind, qualified, parent, covered, end + 1))
+                    continue
+            units.append((kind, qualified, parent, start + 1, end + 1))
+        return units
+
+    def _brace_units_inner(self, lines, start, end, parent):
+        """블록의 여는 { 다음 줄부터 닫는 } 앞줄까지에서 안쪽 블록을 찾습니다."""
+        open_line = start
+        while open_line <= end and "{" not in lines[open_line]:
+            open_line += 1
+        if open_line + 1 >= end:
+            return []
+        return self._brace_units(lines, open_line + 1, end, parent)
+
+    # ---------- HTML ----------
+    def _html_units(self, text, lines):
+        parser = _TagSpanParser()
+        parser.feed(text)
+        parser.close()
+        return self._html_select(parser.roots, lines, "")
+
+    def _html_select(self, elements, lines, parent):
+        units = []
+        for el in elements:
+            name = f"{parent}>{el['label']}" if parent else el["label"]
+            if self._span_chars(lines, el["start"], el["end"]) > self.max_chars and el["children"]:
+                units.extend(self._html_select(el["children"], lines, name))
+            else:
+                units.append(("element", name, parent, el["start"], el["end"]))
+        return units
+
+
+class _TagSpanParser(HTMLParser):
+    """HTML 요소마다 시작 줄과 끝 줄, 자식 요소를 기록하는 간단한 파서"""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.roots = []
+        self.stack = []
+
+    def handle_starttag(self, tag, attrs):
+        line = self.getpos()[0]
+        attrs = dict(attrs)
+        label = tag + (f"#{attrs['id']}" if attrs.get("id") else "")
+        el = {"label": label, "tag": tag, "start": line, "end": line, "children": []}
+        (self.stack[-1]["children"] if self.stack else self.roots).append(el)
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag, attrs):
+        line = self.getpos()[0]
+        el = {"label": tag, "tag": tag, "start": line, "end": line, "children": []}
+        (self.stack[-1]["children"] if self.stack else self.roots).append(el)
+
+    def handle_endtag(self, tag):
+        line = self.getpos()[0]
+        # 짝이 안 맞는 태그는 가장 가까운 같은 이름의 태그까지 닫아 줍니다.
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i]["tag"] == tag:
+                for el in self.stack[i:]:
+                    el["end"] = line
+                del self.stack[i:]
+                return
+
+    def close(self):
+        super().close()
+        last = self.getpos()[0]
+        for el in self.stack:
+            el["end"] = last
+        self.stack = []
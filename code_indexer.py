@@ -1,59 +1,336 @@
 # 내 프로젝트 폴더를 읽어서 벡터 DB와 그래프 DB에 지식으로 저장하는 파일입니다.
 
 import os
-import ast
-from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import time
+import threading
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from graph_manager import CodeGraphManager
+from index_manifest import IndexManifest
+from ingest_pipeline import read_files, BatchWriter
+from code_chunker import CodeChunker
+from retrieval_engine import LexicalIndex
+from symbol_index import SymbolIndex
+from telemetry import TELEMETRY, span
+from graph_builder import CodeGraphBuiler, parse_source_imports, build_module_map, resolve_import
 
 class CodebaseIndexer:
     """
     프로젝트의 모든 파일을 읽어서 검색 가능한 형태로 가공하고 저장하는 클래스
     """
-    def __init__(self, db_path, embed_model):
+    EXTENSIONS = (".py", ".js", ".java", ".html", ".css", ".md")
+    GRAPH_FILE = "code_graph.pkl"
+    COMPACT_GRAPH_FILE = "code_graph.cgrf"
+    IMPORT_CACHE_FILE = "import_cache.json"
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, db_path, embed_model, read_workers=None, embed_batch_size=64, embed_batch_chars=64000, write_batch_size=512,
+                 graph_uri="bolt://localhost:7687", graph_auth=("neo4j", "password"), embeddings=None):
         self.db_path = db_path
-        self.embeddings = HuggingFaceEmbeddings(model_name= embed_model)
+        # embeddings를 넘기면 그 모델을 씀 (보관소의 모델 재사용, 벤치마크용 가짜 임베딩 등)
+        self.embeddings = embeddings or HuggingFaceEmbeddings(model_name= embed_model)
+        # 글자 수가 아니라 함수/클래스 단위로 자르고, 너무 큰 단위만 글자 수로 자름 (겹치는 부분 없음)
+        self.chunker = CodeChunker(max_chars= 1500)
+        # 학습 파이프라인 설정 (파일 읽기 스레드 수, 임베딩 묶음 크기, Chroma 저장 묶음 크기)
+        self.read_workers = read_workers
+        self.embed_batch_size = embed_batch_size
+        self.embed_batch_chars = embed_batch_chars
+        self.write_batch_size = write_batch_size
+        # 관계 그래프 저장소 주소 (bolt:// 이면 Neo4j 서버, sqlite:// 이면 서버 없이 파일 하나에 저장)
+        self.graph_uri = graph_uri
+        self.graph_auth = graph_auth
 
-    def index_project(self, root_dir, user_id, project_name):
-        """
-        폴더 안의 모든 파일을 읽어 VectorDB와 GraphDB를 구축함
-        """
-        all_docs = []
+    def _scan(self, root_dir):
+        """폴더를 돌면서 학습 대상 파일의 {상대경로: (전체경로, 크기, 수정시각)} 을 만듭니다."""
+        with span("index.walk") as s:
+            found = self._walk(root_dir)
+            s.set(files=len(found))
+        return found
+
+    def _walk(self, root_dir):
+        found = {}
         for root, _, files in os.walk(root_dir):
             for file in files:
-                if file.endswith((".py", ".js", ".java", ".html", ".css", ".md")):
+                if file.endswith(self.EXTENSIONS):
                     path = os.path.join(root, file)
                     try:
-                        loader = TextLoader(path, encoding= 'utf-8')
-                        docs = loader.load()
-                        for d in docs:
-                            d.metadata['source'] = os.path.relpath(path, root_dir)
-                        all_docs.extend(docs)
-                    except: continue        # 읽지 못하는 파일 무시하고 넘어감.
-
-        # 1. VectorDB (단어 유사도 기반)
-        splitter = RecursiveCharacterTextSplitter(chunk_size= 1000, chunk_overlap= 200)
-        chunks = splitter.split_documents(all_docs)
-
-        # 사용자별 폴더 구분해서 VectorDB 생성
+                        st = os.stat(path)
+                    except OSError: continue
+                    rel_path = os.path.relpath(path, root_dir).replace("\\", "/")
+                    found[rel_path] = (path, st.st_size, st.st_mtime_ns)
+        return found
+
+    def _parse_imports(self, source, text):
+        """파이썬 파일이면 import 기록 (모듈 이름, 상대 단계, 가져온 이름들) 목록을 돌려줌"""
+        if not source.endswith(".py"):
+            return []
+        return [list(r) for r in parse_source_imports(text)]
+
+    def _resolve_relations(self, manifest, file_imports):
+        """
+        import 기록을 GraphDB에 넣을 (파일, 대상) 관계로 바꿈
+        프로젝트 안의 파일이면 파일 경로로, 밖의 라이브러리면 모듈 이름으로 연결함
+        """
+        module_map = build_module_map(manifest.files)
+        for rel_path, records in file_imports.items():
+            for record in records:
+                targets, external = resolve_import(rel_path, record, module_map)
+                for target in targets:
+                    if target != rel_path:
+                        yield (rel_path, target)
+                if external:
+                    yield (rel_path, external)
+
+    def _stale_importers(self, manifest, indexed_before, changed_files):
+        """
+        파이썬 파일이 추가/삭제되어 모듈 지도가 바뀌었다면, 내용은 그대로지만 import 가 다른 파일로 풀리게 된 파일 목록
+        (새 모듈을 import 하던 파일, 지워진 모듈을 import 하던 파일) 학습 기록에 저장해 둔 import 목록으로 판단함
+        """
+        old_py = {f for f in indexed_before if f.endswith(".py")}
+        new_py = {f for f in manifest.files if f.endswith(".py")}
+        if old_py == new_py:
+            return set()
+        old_map, new_map = build_module_map(old_py), build_module_map(new_py)
+        stale = set()
+        for rel_path, entry in manifest.files.items():
+            if rel_path in changed_files:
+                continue
+            for record in entry.get("imports") or []:
+                if resolve_import(rel_path, record, old_map) != resolve_import(rel_path, record, new_map):
+                    stale.add(rel_path)
+                    break
+        return stale
+
+    def _open_manifest(self, root_dir, persist_dir):
+        """학습 기록을 불러오고, 프로젝트 폴더가 바뀌었다면 이전 기록을 모두 삭제 대상으로 돌려줌"""
+        manifest = IndexManifest(persist_dir)
+        manifest.load()
+        dropped = {}
+        if manifest.root_dir and os.path.abspath(manifest.root_dir) != os.path.abspath(root_dir):
+            dropped, manifest.files = manifest.files, {}
+        manifest.root_dir = os.path.abspath(root_dir)
+        return manifest, dropped
+
+    def _lock_for(self, persist_dir):
+        """같은 프로젝트를 화면과 실시간 동기화가 동시에 고치지 않도록 폴더별 잠금을 돌려줌"""
+        with CodebaseIndexer._locks_guard:
+            return CodebaseIndexer._locks.setdefault(os.path.abspath(persist_dir), threading.Lock())
+
+    def index_project(self, root_dir, user_id, project_name):
+        """
+        폴더 안의 파일을 읽어 VectorDB와 GraphDB를 구축함
+        이전 학습 기록(manifest)과 비교해서 추가/수정된 파일만 다시 임베딩하고,
+        삭제된 파일의 청크와 그래프 연결은 지움
+        """
+        persist_dir = os.path.join(self.db_path, user_id, project_name)
+        with self._lock_for(persist_dir), span("index.project", project=project_name):
+            manifest, dropped = self._open_manifest(root_dir, persist_dir)
+            found = self._scan(root_dir)
+            removed = sorted(set(manifest.files) - set(found))
+            return self._sync(persist_dir, manifest, found, removed, dropped)
+
+    def index_files(self, root_dir, user_id, project_name, rel_paths):
+        """
+        바뀐 파일 몇 개만 골라서 index_project 와 같은 방식으로 반영함 (실시간 동기화용)
+        """
         persist_dir = os.path.join(self.db_path, user_id, project_name)
-        vector_db = Chroma.from_documents(chunks, self.embeddings, persist_directory= persist_dir)
-        vector_db.persist()
-
-        # 2. GraphDB (Neo4j - 관계 기반)
-        # Neo4j 서버가 켜져 있어야 하며, 아이디/비번이 맞아야 함.
-        graph = CodeGraphManager("bolt://localhost:7687", "neo4j", "password")
-        for doc in all_docs:
-            source = doc.metadata['source']
-            if source.endswith(".py"):
+        with self._lock_for(persist_dir), span("index.files", project=project_name, requested=len(rel_paths)):
+            manifest, dropped = self._open_manifest(root_dir, persist_dir)
+            if dropped:
+                # 다른 폴더로 학습된 프로젝트라면 일부만 고칠 수 없으니 전체를 다시 맞춤
+                found = self._scan(root_dir)
+                return self._sync(persist_dir, manifest, found, [], dropped)
+
+            found, removed = {}, []
+            for rel_path in sorted(set(rel_paths)):
+                if not rel_path.endswith(self.EXTENSIONS):
+                    continue
+                path = os.path.join(root_dir, rel_path)
                 try:
-                    tree = ast.parse(doc.page_content)
-                    for node in ast.walk(tree):
-                        if isinstance(node, ast.Import):
-                            for n in node.names: graph.add_relation(source, n.name)
-                except: pass
-        graph.close()
-
-        return len(chunks)
\ No newline at end of file
+                    st = os.stat(path)
+                except OSError:
+                    if rel_path in manifest.files: removed.append(rel_path)
+                    continue
+                found[rel_path] = (path, st.st_size, st.st_mtime_ns)
+            return self._sync(persist_dir, manifest, found, removed, dropped)
+
+    def _sync(self, persist_dir, manifest, found, removed, dropped):
+        """
+        found(검사할 파일)와 removed(지울 파일)를 VectorDB, GraphDB, 학습 기록에 반영함
+        읽기(스레드 풀) → 청크 나누기(제너레이터) → 묶음 임베딩 → 묶음 저장 순서로 흘려보내서
+        프로젝트가 커져도 한 번에 메모리에 올라가는 양은 일정하게 유지됨
+        """
+        started = time.perf_counter()
+        stats = {"scanned": len(found), "skipped": 0, "added": 0, "modified": 0, "removed": len(removed), "embedded_chunks": 0, "changed_files": []}
+        changed_files = set(removed) | set(dropped)
+        indexed_before = set(manifest.files)
+        file_imports = {}
+        split_seconds = 0.0
+        persist_seconds = 0.0
+        writer = None
+        # 단어 검색(BM25)용 역색인도 VectorDB와 같은 청크 id로 함께 고침
+        lexical = LexicalIndex(persist_dir)
+        lexical_ready = lexical.load()
+        # 함수/클래스 정의, 참조, 호출 관계 색인도 바뀐 파이썬 파일만 고침
+        symbols = SymbolIndex(persist_dir)
+        symbols_ready = symbols.load()
+        symbols.root_dir = manifest.root_dir
+        if manifest.files and (manifest.stale or not lexical_ready or not symbols_ready):
+            # 예전 형식으로 학습했거나 단어/심볼 색인 파일이 없으면, 바뀌지 않은 파일도 모두 다시 학습해야 색인이 채워짐
+            manifest.invalidate()
+
+        def open_writer():
+            # 바뀐 파일이 하나도 없으면 VectorDB를 열지 않음
+            vector_db = Chroma(persist_directory= persist_dir, embedding_function= self.embeddings)
+            return BatchWriter(vector_db, self.embeddings, self.embed_batch_size, self.embed_batch_chars, self.write_batch_size)
+
+        if removed or dropped:
+            writer = open_writer()
+            stale_ids = [i for entry in dropped.values() for i in entry["chunk_ids"]]
+            for rel_path in removed:
+                stale_ids.extend(manifest.remove(rel_path)["chunk_ids"])
+            writer.delete(stale_ids)
+            lexical.remove(stale_ids)
+            for rel_path in list(removed) + list(dropped):
+                symbols.remove_file(rel_path)
+
+        # 1. 크기/수정시각이 같은 파일은 읽지도 않고 건너뜀
+        candidates = []
+        for rel_path, (path, size, mtime) in sorted(found.items()):
+            if manifest.is_unchanged(rel_path, size, mtime):
+                stats["skipped"] += 1
+            else:
+                candidates.append((rel_path, path, size, mtime))
+
+        # 2. 나머지는 여러 스레드로 읽으면서 내용 해시로 정말 바뀌었는지 확인하고, 바뀐 파일만 청크로 흘려보냄
+        for rel_path, size, mtime, data in read_files(candidates, self.read_workers):
+            text = None
+            if data is not None:
+                try:
+                    text = data.decode("utf-8")
+                except UnicodeDecodeError:
+                    pass
+            if text is None:
+                # 읽지 못하는 파일 무시하고 넘어감. 이미 학습된 파일이었다면 삭제된 파일처럼 예전 청크와 연결을 지움
+                entry = manifest.remove(rel_path)
+                if entry:
+                    if writer is None:
+                        writer = open_writer()
+                    writer.delete(entry["chunk_ids"])
+                    lexical.remove(entry["chunk_ids"])
+                    symbols.remove_file(rel_path)
+                    changed_files.add(rel_path)
+                    stats["removed"] += 1
+                continue
+            content_hash = IndexManifest.hash_bytes(data)
+            entry = manifest.get(rel_path)
+            if entry and entry["sha256"] == content_hash:
+                manifest.touch(rel_path, size, mtime)
+                stats["skipped"] += 1
+                continue
+            stats["modified" if entry else "added"] += 1
+            changed_files.add(rel_path)
+
+            if writer is None:
+                writer = open_writer()
+            if entry:
+                writer.delete(entry["chunk_ids"])
+                lexical.remove(entry["chunk_ids"])
+            ids = []
+            # 청크 나누기와 색인 시간만 재기 위해 그 사이에 일어난 임베딩/저장 시간은 뺌
+            split_started = time.perf_counter()
+            writer_before = writer.embed_seconds + writer.write_seconds
+            for i, chunk in enumerate(self._iter_chunks(rel_path, text)):
+                chunk_id = f"{rel_path}::{i}"
+                # 벡터 검색 결과도 BM25와 같은 청크 id로 합칠 수 있게 메타데이터에 id를 넣어 둠
+                writer.add(chunk_id, chunk.page_content, {**chunk.metadata, "chunk_id": chunk_id})
+                lexical.add(chunk_id, chunk.page_content, rel_path)
+                ids.append(chunk_id)
+            symbols.update_file(rel_path, text)
+            file_imports[rel_path] = self._parse_imports(rel_path, text)
+            split_seconds += time.perf_counter() - split_started - (writer.embed_seconds + writer.write_seconds - writer_before)
+            manifest.update(rel_path, size, mtime, content_hash, ids, file_imports[rel_path])
+
+        stats["changed_files"] = sorted(changed_files)
+        if writer is not None:
+            writer.flush()
+            stats["embedded_chunks"] = writer.embedded
+            persist_seconds += writer.write_seconds
+        TELEMETRY.record("index.split", split_seconds, files=len(file_imports))
+        TELEMETRY.record("index.embed", writer.embed_seconds if writer else 0.0, chunks=stats["embedded_chunks"])
+
+        if stats["changed_files"]:
+            persist_started = time.perf_counter()
+            lexical.save()
+            symbols.save()
+            persist_seconds += time.perf_counter() - persist_started
+
+        with span("index.graph", files=len(stats["changed_files"])) as s:
+            if stats["changed_files"]:
+                self._update_code_graph(persist_dir, manifest.root_dir, stats["changed_files"])
+
+            # 3. GraphDB (관계 기반)
+            # Neo4j를 쓴다면 서버가 켜져 있어야 하며, 아이디/비번이 맞아야 함.
+            graph = CodeGraphManager(self.graph_uri, *self.graph_auth)
+            try:
+                graph.ensure_schema()
+                generation = graph.generation()
+                if manifest.graph_generation != generation:
+                    # 그래프 DB가 초기화됐거나 이 프로젝트의 연결을 보낸 적이 없으면, 바뀌지 않은 파일도 학습 기록의 import 목록으로 모두 다시 보냄
+                    stale = set(manifest.files)
+                else:
+                    # 새 모듈 지도로 import 가 다르게 풀리는 파일
+                    stale = self._stale_importers(manifest, indexed_before, changed_files)
+                graph_imports = dict(file_imports)
+                for rel_path in stale - set(graph_imports):
+                    graph_imports[rel_path] = manifest.files[rel_path].get("imports") or []
+                graph_files = sorted(changed_files | set(graph_imports))
+
+                relations = 0
+                if graph_files:
+                    graph.remove_files(graph_files)
+                    relations = graph.add_relations(self._resolve_relations(manifest, graph_imports))
+                    relations += graph.add_symbol_relations(symbols.relations(graph_imports))
+                manifest.graph_generation = generation
+            finally:
+                graph.close()
+            s.set(relations=relations, graph_files=len(graph_files))
+
+        # 모든 저장이 끝난 뒤에 기록을 남겨야, 중간 실패 시 다음 학습에서 다시 처리됨
+        persist_started = time.perf_counter()
+        manifest.save()
+        persist_seconds += time.perf_counter() - persist_started
+        TELEMETRY.record("index.persist", persist_seconds, chunks=stats["embedded_chunks"])
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_sec"] = round(elapsed, 3)
+        stats["files_per_sec"] = round(len(found) / elapsed, 1) if elapsed > 0 else 0.0
+        stats["chunks_per_sec"] = round(stats["embedded_chunks"] / elapsed, 1) if elapsed > 0 else 0.0
+        return stats
+
+    def _update_code_graph(self, persist_dir, root_dir, changed_files):
+        """
+        검색 엔진이 관련 파일을 찾을 때 쓰는 import 그래프를 바뀐 파이썬 파일만 고쳐서 저장함
+        code_graph.pkl 은 다음 수정을 위한 원본, code_graph.cgrf 는 검색용 압축본
+        """
+        changed_py = [f for f in changed_files if f.endswith(".py")]
+        if not changed_py:
+            return
+        graph_path = os.path.join(persist_dir, self.GRAPH_FILE)
+        builder = CodeGraphBuiler()
+        if not builder.load(graph_path):
+            builder.build_graph(root_dir, cache_path=os.path.join(persist_dir, self.IMPORT_CACHE_FILE))
+        else:
+            for rel_path in changed_py:
+                if os.path.exists(os.path.join(root_dir, rel_path)):
+                    builder.update_file(root_dir, rel_path)
+                else:
+                    builder.remove_file(rel_path)
+        builder.save(graph_path)
+        # 검색할 때는 메모리 매핑으로 바로 읽을 수 있는 배열 형식을 씀
+        builder.save_compact(os.path.join(persist_dir, self.COMPACT_GRAPH_FILE))
+
+    def _iter_chunks(self, rel_path, text):
+        """[2단계] 파일 하나를 함수/클래스/메서드 단위 청크로 나눠서 하나씩 내보냄"""
+        yield from self.chunker.split(rel_path, text)
@@ -0,0 +1,233 @@
+# import 그래프를 숫자 배열(CSR)로 압축해서 저장하고, 파일을 메모리 매핑해 바로 읽어 쓰는 파일입니다.
+# pickle처럼 전체를 풀어서 객체로 만들 필요가 없어서 큰 프로젝트에서도 거의 즉시 불러옵니다.
+
+import os
+import sys
+import mmap
+import struct
+from array import array
+from collections import deque
+
+MAGIC = b"CGRF"
+VERSION = 1
+# 머리말: 매직, 버전, 점 개수, 선 개수, 이름 데이터 길이
+HEADER = struct.Struct("<4sIIIQ")
+
+
+def _u32(values):
+    return array("I", values)
+
+
+class CompactGraph:
+    """
+    파일 이름을 정렬된 번호로 바꾸고(interning), 나가는 선/들어오는 선을 CSR 배열로 가진 읽기 전용 그래프
+    - fwd_offsets[i] ~ fwd_offsets[i+1]: i번 파일이 import 하는 파일들(fwd_targets)의 위치
+    - rev_offsets[i] ~ rev_offsets[i+1]: i번 파일을 import 하는 파일들(rev_sources)의 위치
+    CodeGraphBuiler와 같은 get_related_files 를 제공합니다.
+
+    [파일 형식 v1] (리틀 엔디언)
+    머리말(24바이트) | 이름 위치 (n+1)개 | fwd_offsets (n+1)개 | fwd_targets m개 | rev_offsets (n+1)개 | rev_sources m개 | 이름 데이터(utf-8)
+    숫자는 모두 4바이트 부호 없는 정수입니다.
+    """
+    def __init__(self):
+        self.n_nodes = 0
+        self.n_edges = 0
+        self._name_offsets = _u32([0])
+        self._names_blob = b""
+        self.fwd_offsets = _u32([0])
+        self.fwd_targets = _u32([])
+        self.rev_offsets = _u32([0])
+        self.rev_sources = _u32([])
+        self._mmap = None
+        self._file = None
+        self._view = None
+
+    # ---------- 만들기 ----------
+    @classmethod
+    def from_edges(cls, nodes, edges):
+        """파일 이름 목록과 (A, B) 선 목록으로 그래프를 만듭니다."""
+        names = sorted(set(nodes) | {a for a, _ in edges} | {b for _, b in edges})
+        index = {name: i for i, name in enumerate(names)}
+        n = len(names)
+        pairs = sorted({(index[a], index[b]) for a, b in edges})
+
+        graph = cls()
+        graph.n_nodes = n
+        graph.n_edges = len(pairs)
+        graph.fwd_offsets, graph.fwd_targets = cls._csr(n, pairs)
+        graph.rev_offsets, graph.rev_sources = cls._csr(n, sorted((b, a) for a, b in pairs))
+
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        graph._name_offsets = _u32(offsets)
+        graph._names_blob = b"".join(encoded)
+        return graph
+
+    @classmethod
+    def from_networkx(cls, graph):
+        return cls.from_edges(list(graph.nodes), list(graph.edges))
+
+    @staticmethod
+    def _csr(n, pairs):
+        offsets = [0] * (n + 1)
+        for a, _ in pairs:
+            offsets[a + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        return _u32(offsets), _u32([b for _, b in pairs])
+
+    # ---------- 저장/불러오기 ----------
+    def save(self, save_path):
+        """버전이 있는 바이너리 형식으로 저장합니다. 임시 파일에 쓰고 교체합니다."""
+        tmp_path = save_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.n_nodes, self.n_edges, len(self._names_blob)))
+            for arr in (self._name_offsets, self.fwd_offsets, self.fwd_targets, self.rev_offsets, self.rev_sources):
+                arr = array("I", arr)
+                if sys.byteorder != "little":
+                    arr.byteswap()
+                f.write(arr.tobytes())
+            f.write(bytes(self._names_blob))
+        os.replace(tmp_path, save_path)
+
+    def load(self, load_path, use_mmap=True):
+        """
+        저장된 그래프를 불러옵니다. use_mmap이면 파일을 메모리 매핑해서 배열을 복사 없이 바로 씁니다.
+        파일이 없거나 형식이 다르면 False를 돌려줍니다.
+        """
+        if not os.path.exists(load_path):
+            return False
+        self.close()
+        f = open(load_path, "rb")
+        try:
+            if use_mmap and sys.byteorder == "little" and os.path.getsize(load_path) > 0:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buf = f.read()
+        except (OSError, ValueError):
+            f.close()
+            return False
+        if len(buf) < HEADER.size:
+            f.close()
+            return False
+        magic, version, n, m, blob_len = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            f.close()
+            return False
+
+        view = memoryview(buf)
+        pos = HEADER.size
+        arrays = []
+        for count in (n + 1, n + 1, m, n + 1, m):
+            size = count * 4
+            if isinstance(buf, mmap.mmap):
+                arrays.append(view[pos:pos + size].cast("I"))
+            else:
+                arr = array("I")
+                arr.frombytes(bytes(view[pos:pos + size]))
+                if sys.byteorder != "little":
+                    arr.byteswap()
+                arrays.append(arr)
+            pos += size
+        self._name_offsets, self.fwd_offsets, self.fwd_targets, self.rev_offsets, self.rev_sources = arrays
+        self._names_blob = view[pos:pos + blob_len]
+        self.n_nodes, self.n_edges = n, m
+        if isinstance(buf, mmap.mmap):
+            self._mmap, self._file, self._view = buf, f, view
+        else:
+            f.close()
+        return True
+
+    def close(self):
+        """메모리 매핑을 풉니다. (배열 조각을 먼저 놓아야 mmap을 닫을 수 있음)"""
+        if self._mmap is None:
+            return
+        for name in ("_name_offsets", "fwd_offsets", "fwd_targets", "rev_offsets", "rev_sources", "_names_blob", "_view"):
+            value = getattr(self, name)
+            if isinstance(value, memoryview):
+                value.release()
+        buf, f = self._mmap, self._file
+        self.__init__()
+        buf.close()
+        f.close()
+
+    # ---------- 이름 <-> 번호 ----------
+    def name(self, node_id):
+        start, end = self._name_offsets[node_id], self._name_offsets[node_id + 1]
+        return bytes(self._names_blob[start:end]).decode("utf-8")
+
+    def node_id(self, name):
+        """이름은 정렬되어 저장되어 있으므로 이진 탐색으로 번호를 찾습니다. 없으면 None."""
+        key = name.encode("utf-8")
+        lo, hi = 0, self.n_nodes
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = bytes(self._names_blob[self._name_offsets[mid]:self._name_offsets[mid + 1]])
+            if value < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_nodes and self.name(lo) == name:
+            return lo
+        return None
+
+    def __contains__(self, name):
+        return self.node_id(name) is not None
+
+    def __len__(self):
+        return self.n_nodes
+
+    # ---------- 질의 ----------
+    def successors(self, node_id):
+        return self.fwd_targets[self.fwd_offsets[node_id]:self.fwd_offsets[node_id + 1]]
+
+    def predecessors(self, node_id):
+        return self.rev_sources[self.rev_offsets[node_id]:self.rev_offsets[node_id + 1]]
+
+    def get_related_files(self, file_path, limit=3):
+        """
+        특정 파일과 연결된 파일들(내가 import 한 파일 + 나를 import 한 파일)을 찾아줍니다.
+        """
+        node = self.node_id(file_path)
+        if node is None:
+            return []
+        related = []
+        seen = set()
+        for other in list(self.successors(node)) + list(self.predecessors(node)):
+            if other not in seen:
+                seen.add(other)
+                related.append(self.name(other))
+        return related[:limit]
+
+    def _bfs(self, file_path, hops, directions):
+        start = self.node_id(file_path)
+        if start is None:
+            return []
+        dist = {start: 0}
+        queue = deque([start])
+        order = []
+        while queue:
+            node = queue.popleft()
+            if hops is not None and dist[node] >= hops:
+                continue
+            for step in directions:
+                for other in step(node):
+                    if other not in dist:
+                        dist[other] = dist[node] + 1
+                        order.append(other)
+                        queue.append(other)
+        return [self.name(n) for n in order]
+
+    def neighbors_within(self, file_path, hops=2):
+        """import 방향과 관계없이 hops 단계 안에 닿는 파일들을 가까운 순서로 돌려줍니다."""
+        return self._bfs(file_path, hops, (self.successors, self.predecessors))
+
+    def transitive_dependencies(self, file_path):
+        """이 파일이 직접/간접적으로 import 하는 모든 파일"""
+        return self._bfs(file_path, None, (self.successors,))
+
+    def transitive_dependents(self, file_path):
+        """이 파일을 직접/간접적으로 import 하는 모든 파일 (이 파일을 고치면 영향을 받는 범위)"""
+        return self._bfs(file_path, None, (self.predecessors,))
@@ -0,0 +1,48 @@
+# 여러 사용자가 동시에 질문해도 Ollama 서버가 감당할 수 있는 만큼만 요청을 보내도록 조절하는 파일입니다.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+
+class ModelConcurrencyLimiter:
+    """
+    AI 모델마다 동시에 처리할 수 있는 요청 수를 제한하는 클래스
+    Ollama는 모델마다 병렬 처리 수(OLLAMA_NUM_PARALLEL)가 정해져 있어서, 넘치는 요청은 여기서 기다리게 합니다.
+    모델마다 스레드 세마포어 하나만 두고, 스레드(slot)와 asyncio(aslot)가 같은 한도를 나눠 씁니다.
+    """
+    def __init__(self, default_limit=2, limits=None, max_waiters=32):
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+        self._lock = threading.Lock()
+        self._slots = {}
+        # aslot이 자리를 기다리는 동안 이벤트 루프를 막지 않도록 기다림은 이 스레드들이 대신함
+        self._waiters = ThreadPoolExecutor(max_workers=max_waiters, thread_name_prefix="model-slot")
+
+    def limit_for(self, model_name):
+        return self.limits.get(model_name, self.default_limit)
+
+    def slot(self, model_name):
+        """스레드용: with limiter.slot(model): ... 으로 사용합니다."""
+        with self._lock:
+            if model_name not in self._slots:
+                self._slots[model_name] = threading.BoundedSemaphore(self.limit_for(model_name))
+            return self._slots[model_name]
+
+    @asynccontextmanager
+    async def aslot(self, model_name):
+        """asyncio용: async with limiter.aslot(model): ... 으로 사용합니다. slot과 같은 세마포어를 씁니다."""
+        semaphore = self.slot(model_name)
+        if not semaphore.acquire(blocking=False):
+            future = self._waiters.submit(semaphore.acquire)
+            try:
+                await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # 기다리던 작업이 취소돼도 스레드는 자리를 얻을 수 있으므로, 얻으면 바로 돌려줌
+                future.add_done_callback(lambda f: f.cancelled() or semaphore.release())
+                raise
+        try:
+            yield
+        finally:
+            semaphore.release()
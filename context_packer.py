@@ -0,0 +1,127 @@
+# 검색된 코드 조각들을 AI에게 보내기 전에 정리하는 파일입니다.
+# 겹치는 조각은 합치고, 거의 같은 조각은 버리고, 모델의 문맥 길이 안에 들어가도록 중요한 것부터 담습니다.
+
+import re
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def estimate_tokens(text):
+    """토크나이저 없이 토큰 수를 어림합니다. (코드는 대략 4글자에 1토큰)"""
+    return len(text) // 4 + 1
+
+
+def context_budget(context_length, *prompt_parts, answer_reserve=1024, overhead=64):
+    """
+    모델 문맥 길이에서 답변 자리와 질문/지침 프롬프트 몫을 빼고, 검색 결과에 쓸 수 있는 토큰 수를 돌려줍니다.
+    """
+    used = sum(estimate_tokens(p or "") for p in prompt_parts) + answer_reserve + overhead
+    return max(0, context_length - used)
+
+
+def _shingles(text, size=5):
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextPacker:
+    """
+    검색 결과(관련도 순서의 Document 목록)를 프롬프트에 넣을 문맥 문자열로 만드는 클래스
+    1. 같은 파일에서 줄 범위가 겹치거나 맞닿은 조각은 하나로 합칩니다.
+    2. 내용이 거의 같은 조각(단어 5개 묶음 기준 자카드 유사도)은 관련도가 높은 것만 남깁니다.
+    3. 관련도 순서대로 토큰 예산이 찰 때까지 담고, 각 조각 앞에 파일 이름과 줄 범위를 붙입니다.
+    """
+    def __init__(self, near_duplicate=0.8, min_piece_tokens=48):
+        self.near_duplicate = near_duplicate
+        self.min_piece_tokens = min_piece_tokens
+
+    def _merge(self, docs):
+        """같은 파일의 겹치거나 맞닿은 조각을 합친 블록 목록을 만듭니다. 블록의 관련도는 가장 높은 조각을 따릅니다."""
+        blocks = []
+        by_source = {}
+        for rank, d in enumerate(docs):
+            meta = d.metadata
+            start, end = meta.get("start_line"), meta.get("end_line")
+            lines = d.page_content.splitlines()
+            source = meta.get("source", "")
+            if start is None or end is None:
+                blocks.append({"source": source, "start": None, "end": None, "lines": lines, "rank": rank})
+                continue
+            by_source.setdefault(source, []).append({"source": source, "start": start, "end": start + len(lines) - 1 if lines else end,
+                                                     "lines": lines, "rank": rank})
+
+        for source, pieces in by_source.items():
+            pieces.sort(key=lambda p: p["start"])
+            current = pieces[0]
+            for piece in pieces[1:]:
+                if piece["start"] <= current["end"] + 1:
+                    # 겹치는 줄은 한 번만 넣고 뒤쪽 조각의 나머지 줄만 이어 붙임
+                    skip = current["end"] - piece["start"] + 1
+                    if piece["end"] > current["end"]:
+                        current["lines"] = current["lines"] + piece["lines"][max(0, skip):]
+                        current["end"] = piece["end"]
+                    current["rank"] = min(current["rank"], piece["rank"])
+                else:
+                    blocks.append(current)
+                    current = piece
+            blocks.append(current)
+        return sorted(blocks, key=lambda b: b["rank"])
+
+    def _dedupe(self, blocks):
+        kept = []
+        kept_shingles = []
+        for block in blocks:
+            shingles = _shingles("\n".join(block["lines"]))
+            duplicate = False
+            for other in kept_shingles:
+                union = len(shingles | other)
+                if union and len(shingles & other) / union >= self.near_duplicate:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append(block)
+                kept_shingles.append(shingles)
+        return kept
+
+    @staticmethod
+    def _header(block, start, end):
+        if start is None:
+            return f"### {block['source']}"
+        return f"### {block['source']} (lines {start}-{end})"
+
+    def pack(self, docs, max_tokens):
+        """
+        문맥 문자열과, 실제로 담긴 파일 목록을 돌려줍니다.
+        """
+        blocks = self._dedupe(self._merge(docs))
+        parts = []
+        sources = []
+        remaining = max_tokens
+        for block in blocks:
+            header = self._header(block, block["start"], block["end"])
+            body = "\n".join(block["lines"])
+            cost = estimate_tokens(header) + estimate_tokens(body)
+            if cost > remaining:
+                # 다 못 넣으면 앞부분만 잘라서라도 넣음 (너무 작게 남으면 포기)
+                if remaining < self.min_piece_tokens:
+                    continue
+                lines = []
+                budget = remaining - estimate_tokens(header) - 1
+                for line in block["lines"]:
+                    budget -= estimate_tokens(line + "\n")
+                    if budget < 0:
+                        break
+                    lines.append(line)
+                if not lines:
+                    continue
+                end = None if block["start"] is None else block["start"] + len(lines) - 1
+                header = self._header(block, block["start"], end)
+                body = "\n".join(lines)
+                cost = estimate_tokens(header) + estimate_tokens(body)
+            parts.append(f"{header}\n{body}")
+            remaining -= cost
+            if block["source"] and block["source"] not in sources:
+                sources.append(block["source"])
+        return "\n\n".join(parts), sources
@@ -1,13 +1,183 @@
 import os
 import ast
+import json
+import hashlib
 import networkx as nx
 import pickle
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from compact_graph import CompactGraph
+
+
+def parse_source_imports(source):
+    """
+    파이썬 소스 코드에서 import 구문을 (모듈 이름, 상대 단계, 가져온 이름들) 목록으로 뽑아냅니다.
+    - import a.b          -> ("a.b", 0, [])
+    - from a.b import c   -> ("a.b", 0, ["c"])
+    - from ..x import y   -> ("x", 2, ["y"])
+    """
+    records = []
+    try:
+        # ast.parse는 소스 코드를 읽어서 컴퓨터가 이해하기 쉬운 트리 구조로 바꿉니다.
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return records
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                records.append((alias.name, 0, []))
+        elif isinstance(node, ast.ImportFrom):
+            records.append((node.module or "", node.level, [alias.name for alias in node.names]))
+    return records
+
+
+def parse_file_imports(full_path):
+    """
+    파일 하나를 읽어 import 목록과 내용 해시를 돌려줍니다. (프로세스 풀에서 실행되도록 모듈 함수로 둠)
+    """
+    try:
+        with open(full_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None, []
+    try:
+        source = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return hashlib.sha256(data).hexdigest(), []
+    return hashlib.sha256(data).hexdigest(), parse_source_imports(source)
+
+
+def module_name_of(rel_path):
+    """파일 경로를 모듈 이름으로 바꿉니다. (pkg/mod.py -> pkg.mod, pkg/__init__.py -> pkg)"""
+    parts = rel_path[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def build_module_map(rel_paths):
+    """프로젝트의 {모듈 이름: 파일 경로} 지도를 만듭니다."""
+    module_map = {}
+    for rel_path in rel_paths:
+        if rel_path.endswith(".py"):
+            name = module_name_of(rel_path)
+            if name:
+                module_map[name] = rel_path
+    return module_map
+
+
+def resolve_import(rel_path, record, module_map):
+    """
+    import 기록 하나를 프로젝트 안의 파일 경로로 바꿉니다.
+    (찾은 파일 경로 목록, 프로젝트 밖의 모듈 이름 또는 None) 을 돌려줍니다.
+    """
+    if isinstance(record, str):
+        record = (record, 0, [])        # 예전 형식(모듈 이름만 저장)도 읽을 수 있게 함
+    module, level, names = record
+
+    if level:
+        # 상대 import: 현재 파일이 속한 패키지에서 level-1 단계 위로 올라감
+        package = module_name_of(rel_path).split(".")
+        if not rel_path.endswith("__init__.py"):
+            package = package[:-1]
+        if level - 1 > len(package):
+            return [], None
+        base_parts = package[:len(package) - (level - 1)]
+        base = ".".join(base_parts + ([module] if module else []))
+    else:
+        base = module
+
+    targets = []
+    # from pkg import mod 처럼 가져온 이름이 하위 모듈이면 그 파일을 가리킴
+    for name in names:
+        sub = f"{base}.{name}" if base else name
+        if sub in module_map:
+            targets.append(module_map[sub])
+    if base in module_map:
+        if not targets or not names:
+            targets.append(module_map[base])
+    elif not targets and base:
+        # import a.b.c 가 없으면 가장 가까운 상위 패키지(a.b 의 __init__.py)라도 연결
+        parts = base.split(".")
+        while len(parts) > 1:
+            parts.pop()
+            prefix = ".".join(parts)
+            if prefix in module_map:
+                targets.append(module_map[prefix])
+                break
+
+    if targets:
+        return targets, None
+    return [], (base if not level else None)
+
+
+class ImportCache:
+    """
+    파일별 import 목록을 (크기, 수정시각, 내용 해시)와 함께 기억해 두는 JSON 캐시
+    바뀌지 않은 파일은 다시 파싱하지 않습니다. 수정시각만 바뀐 파일(git checkout 등)은 내용 해시로 확인합니다.
+    """
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError):
+                self.files = {}
+
+    def get(self, rel_path, size, mtime):
+        entry = self.files.get(rel_path)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            return entry["imports"]
+        return None
+
+    def get_if_same_content(self, rel_path, full_path, size, mtime):
+        """
+        크기/수정시각이 달라도 내용 해시가 기록과 같으면 import 목록을 돌려주고 크기/수정시각을 갱신합니다.
+        (파싱 없이 파일을 읽어 해시만 계산함)
+        """
+        entry = self.files.get(rel_path)
+        if not entry or not entry.get("sha256"):
+            return None
+        try:
+            with open(full_path, "rb") as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        if content_hash != entry["sha256"]:
+            return None
+        entry["size"] = size
+        entry["mtime"] = mtime
+        return entry["imports"]
+
+    def put(self, rel_path, size, mtime, content_hash, imports):
+        self.files[rel_path] = {"size": size, "mtime": mtime, "sha256": content_hash, "imports": [list(r) for r in imports]}
+
+    def retain(self, rel_paths):
+        """지워진 파일의 기록은 버립니다."""
+        self.files = {k: v for k, v in self.files.items() if k in rel_paths}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
 
 
 class CodeGraphBuiler:
     """
     프로젝트 내의 코드 파일들이 서로 어떻게 연결되어 있는지를 분석하여 그래프로 만드는 클래스입니다.
     """
+    # 이보다 파싱할 파일이 적으면 프로세스를 띄우는 비용이 더 크므로 한 프로세스에서 처리합니다.
+    PARALLEL_THRESHOLD = 64
 
     def __init__(self):
         self.graph = nx.DiGraph()
@@ -16,29 +186,25 @@ class CodeGraphBuiler:
         """
         하나의 파이썬 파일을 열어서, 이 파일이 어떤 다른 파일들을 import(참조)하는지 찾아냅니다.
         """
-        imports = []
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                # ast.parse는 소스 코드를 읽어서 컴퓨터가 이해하기 쉬운 트리 구조로 바꿉니다.
-                tree = ast.parse(f.read())
-
-            # 트리 구조를 순회하면서 'Import'나 'ImportFrom' 구문을 찾습니다.
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        imports.append(alias.name)
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.append(node.module)
-        except Exception:
-            pass
-        return imports
-
-    def build_graph(self, root_dir):
+        return parse_file_imports(file_path)[1]
+
+    def _link(self, rel_path, module_map):
+        """파일 하나의 import 기록을 모듈 지도로 풀어서 선을 긋습니다."""
+        for record in self.graph.nodes[rel_path].get("imports", []):
+            targets, _ = resolve_import(rel_path, record, module_map)
+            for target in targets:
+                if target != rel_path:
+                    self.graph.add_edge(rel_path, target, type="import")
+
+    def build_graph(self, root_dir, workers=None, cache_path=None):
         """
         프로젝트 폴더 전체를 돌면서 모든 파일의 관계도를 그립니다.
+        - 바뀐 파일만 파싱합니다. (cache_path 에 파일별 import 목록을 기억)
+        - 파싱할 파일이 많으면 여러 프로세스(workers 개, 기본은 CPU 수)로 나눠 처리합니다.
+        - 절대/상대 import, 패키지(__init__.py) import 를 프로젝트의 모듈 지도로 정확히 연결합니다.
         """
         print(f"그래프 구조 분석 시작: {root_dir}")
+        cache = ImportCache(cache_path)
 
         # 1. 모든 파일을 노드(점)로 등록합니다.
         file_paths = []
@@ -50,19 +216,79 @@ class CodeGraphBuiler:
                     file_paths.append((full_path, rel_path))
                     self.graph.add_node(rel_path, type="file")
 
-        # 2. 파일 내용을 읽어서 연결 선(Edge)을 긋습니다.
+        # 2. 캐시에 없거나 바뀐 파일만 골라서 파싱합니다.
+        misses = []
         for full_path, rel_path in file_paths:
-            # 이 파일이 import 하고 있는 모듈 목록을 가져옵니다.
-            imported_modules = self._parse_imports(full_path)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            imports = cache.get(rel_path, st.st_size, st.st_mtime_ns)
+            if imports is None:
+                imports = cache.get_if_same_content(rel_path, full_path, st.st_size, st.st_mtime_ns)
+            if imports is None:
+                misses.append((full_path, rel_path, st.st_size, st.st_mtime_ns))
+            else:
+                self.graph.nodes[rel_path]["imports"] = imports
+
+        paths = [m[0] for m in misses]
+        if len(misses) >= self.PARALLEL_THRESHOLD and (workers or os.cpu_count() or 1) > 1:
+            # 화면과 실시간 동기화 스레드가 도는 프로세스를 fork 하면 잠금이 잠긴 채로 복사될 수 있으므로 spawn 으로 띄움
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = list(pool.map(parse_file_imports, paths, chunksize=max(1, len(paths) // ((workers or os.cpu_count()) * 4))))
+        else:
+            results = [parse_file_imports(p) for p in paths]
+
+        for (_, rel_path, size, mtime), (content_hash, imports) in zip(misses, results):
+            # 나중에 새 파일이 생겼을 때 다시 연결할 수 있도록 import 목록을 점에 기억해 둡니다.
+            self.graph.nodes[rel_path]["imports"] = [list(r) for r in imports]
+            if content_hash is not None:
+                cache.put(rel_path, size, mtime, content_hash, imports)
+        cache.retain({rel for _, rel in file_paths})
+        cache.save()
+
+        # 3. 모듈 지도를 만들고 import 를 실제 파일로 풀어서 연결 선(Edge)을 긋습니다.
+        module_map = build_module_map(self.graph.nodes)
+        for _, rel_path in file_paths:
+            self._link(rel_path, module_map)
+
+    def update_file(self, root_dir, rel_path):
+        """
+        파일 하나가 새로 생기거나 바뀌었을 때, 그 파일과 관련된 선만 다시 긋습니다.
+        """
+        if not rel_path.endswith(".py"):
+            return
+        is_new = rel_path not in self.graph
+        if not is_new:
+            # 이 파일에서 나가는 선(내가 import 한 파일)만 지우고 다시 그립니다.
+            self.graph.remove_edges_from(list(self.graph.out_edges(rel_path)))
+        self.graph.add_node(rel_path, type="file")
+        self.graph.nodes[rel_path]["imports"] = [list(r) for r in self._parse_imports(os.path.join(root_dir, rel_path))]
+
+        module_map = build_module_map(self.graph.nodes)
+        self._link(rel_path, module_map)
 
-            for module in imported_modules:
-                # import 된 모듈 이름(예: utils.helper)을 파일 경로(utlts/helper.py)로 추측해봅니다.
-                potential_path = module.replace(".", "/") + ".py"
+        # 새로 생긴 파일이라면, 이 파일을 기다리던(import 하고 있던) 다른 파일들과도 연결합니다.
+        if is_new:
+            self._relink_others(rel_path, module_map)
 
-                # 만약 그 추측한 경로가 우리 그래프에 이미 있는 파일이라면
-                if potential_path in self.graph.nodes:
-                    # 두 파일 사이에 선(Edge)을 긋습니다.
-                    self.graph.add_edge(rel_path, potential_path, type="import")
+    def _relink_others(self, rel_path, module_map):
+        """
+        모듈 지도가 바뀌었을 때 다른 파일들의 선을 다시 긋습니다.
+        예전에 상위 패키지(__init__.py)로 대신 이어 둔 선이 남지 않도록 나가는 선을 먼저 지워서, 처음부터 만든 그래프와 같게 합니다.
+        """
+        for other in list(self.graph.nodes):
+            if other != rel_path:
+                self.graph.remove_edges_from(list(self.graph.out_edges(other)))
+                self._link(other, module_map)
+
+    def remove_file(self, rel_path):
+        """
+        삭제된 파일을 점과 선 모두 그래프에서 지우고, 이 파일을 import 하던 파일들은 바뀐 모듈 지도로 다시 연결합니다.
+        """
+        if rel_path in self.graph:
+            self.graph.remove_node(rel_path)
+            self._relink_others(rel_path, build_module_map(self.graph.nodes))
 
     def get_related_files(self, file_path, limit=3):
         """
@@ -80,6 +306,18 @@ class CodeGraphBuiler:
         # 너무 많으면 limit 개수만큼만 자릅니다.
         return list(set(related))[:limit]
 
+    def to_compact(self):
+        """
+        지금 그래프를 배열 기반의 읽기 전용 그래프(CompactGraph)로 바꿉니다.
+        """
+        return CompactGraph.from_networkx(self.graph)
+
+    def save_compact(self, save_path):
+        """
+        배열 기반 형식으로 저장합니다. pickle보다 작고, 메모리 매핑으로 바로 불러올 수 있습니다.
+        """
+        self.to_compact().save(save_path)
+
     def save(self, save_path):
         """
         만들어진 그래프 지도를 파일로 저장합니다.
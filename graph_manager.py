@@ -1,39 +1,395 @@
-# Neo4j DB를 사용해서 코드 간의 복잡한 연결 고리를 관리하는 파일
+# 코드 간의 복잡한 연결 고리를 그래프 DB에 저장하고 찾아오는 파일
+# Neo4j 서버(bolt://) 또는 프로세스 안에서 바로 도는 SQLite(sqlite://) 중 하나를 골라 씀
 
-from neo4j import GraphDatabase
+import os
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
 
-class CodeGraphManager:
+DEFAULT_REL = "IMPORT"
+
+
+def format_relation(source, rel_type, target):
+    """화면(app.py)이 읽는 관계 문자열 형식: "출발 --(관계)-- 도착" (선의 방향 그대로)"""
+    return f"{source} --({rel_type})-- {target}"
+
+
+class GraphBackend(ABC):
     """
-    코드 파일들이 서로 어떻게 호출되고 참조하는지 선으로 연결해 관리하는 클래스
+    그래프 저장소가 갖춰야 할 기능 목록. 관계(rows)는 {"source", "target", "rel"} 사전 목록입니다.
+    파일 사이 관계(import)와 심볼 관계(DEFINES/CALLS)는 따로 저장해서, 파일 이웃을 찾을 때 심볼이 섞이지 않게 합니다.
+    """
+    def ensure_schema(self):
+        pass
+
+    @abstractmethod
+    def write_relations(self, rows):
+        ...
+
+    @abstractmethod
+    def write_symbol_relations(self, rows):
+        """rows: {"source", "target", "rel", "file"(관계를 만든 파일), "target_file"} 사전 목록"""
+
+    @abstractmethod
+    def remove_files(self, names):
+        ...
+
+    @abstractmethod
+    def related_nodes(self, name):
+        ...
+
+    @abstractmethod
+    def relations_of(self, name, limit):
+        """name 으로 들어오고 나가는 선의 (출발, 도착, 관계 종류) 목록. 방향을 그대로 지킵니다."""
+
+    @abstractmethod
+    def generation(self):
+        """저장소의 세대 값. reset 할 때마다 바뀌므로, 학습 기록과 비교해서 초기화된 그래프를 알아챌 수 있음"""
+
+    @abstractmethod
+    def reset(self):
+        ...
+
+    def close(self):
+        pass
+
+
+class Neo4jBackend(GraphBackend):
+    """
+    Neo4j 서버에 Cypher로 저장하는 저장소 (여러 서버가 같은 그래프를 볼 때 사용)
     """
     def __init__(self, uri, user, password):
+        # neo4j 드라이버는 이 저장소를 쓸 때만 필요함
+        from neo4j import GraphDatabase
         # Neo4j DB에 접속하기 위한 주소와 아이디, 암호를 설정
         self.driver = GraphDatabase.driver(uri, auth= (user, password))
 
     def close(self):
         self.driver.close()
 
-    def add_relation(self, source_file, target_file, rel_type= "IMPORT"):
+    def ensure_schema(self):
         """
-        파일 A가 파일 B를 참조한다는 연결 고리를 DB에 기록
+        File.name, Symbol.name 에 유일 제약(자동으로 인덱스도 만들어짐)을 걸어서 MERGE가 전체 노드를 훑지 않게 하고,
+        파일 단위로 심볼을 지울 수 있게 Symbol.file 에 인덱스를 만듦
         """
         with self.driver.session() as session:
-            # Cypher라는 그래프 전용 언어를 사용해 데이터를 저장함. (MERGE: 없으면 만들고, 있으면 유지함)
-            session.run("""
-                MERGE (a:File {name: $source})
-                MERGE (b:File {name: $target})
-                MERGE (a)-[r:REL {type: $rel}]->(b)            
-            """, source=source_file, target= target_file, rel= rel_type)
-    
-    def get_related_nodes(self, file_name):
+            session.run("CREATE CONSTRAINT file_name_unique IF NOT EXISTS FOR (f:File) REQUIRE f.name IS UNIQUE")
+            session.run("CREATE CONSTRAINT symbol_name_unique IF NOT EXISTS FOR (s:Symbol) REQUIRE s.name IS UNIQUE")
+            session.run("CREATE INDEX symbol_file IF NOT EXISTS FOR (s:Symbol) ON (s.file)")
+
+    def write_relations(self, rows):
+        # UNWIND 한 번, 트랜잭션 한 번으로 보내서 왕복 횟수를 줄임
+        with self.driver.session() as session:
+            session.execute_write(self._write_relations, rows)
+
+    @staticmethod
+    def _write_relations(tx, batch):
+        # Cypher라는 그래프 전용 언어를 사용해 데이터를 저장함. (MERGE: 없으면 만들고, 있으면 유지함)
+        tx.run("""
+            UNWIND $rows AS row
+            MERGE (a:File {name: row.source})
+            MERGE (b:File {name: row.target})
+            MERGE (a)-[r:REL {type: row.rel}]->(b)
+        """, rows= batch)
+
+    def write_symbol_relations(self, rows):
+        with self.driver.session() as session:
+            session.execute_write(self._write_symbol_relations, rows)
+
+    @staticmethod
+    def _write_symbol_relations(tx, batch):
+        # 심볼은 :Symbol 점에 어느 파일의 심볼인지(file)를 함께 기록함
+        tx.run("""
+            UNWIND $rows AS row
+            WITH row WHERE row.rel = 'DEFINES'
+            MERGE (f:File {name: row.source})
+            MERGE (s:Symbol {name: row.target})
+            SET s.file = row.target_file
+            MERGE (f)-[:DEFINES]->(s)
+        """, rows= batch)
+        tx.run("""
+            UNWIND $rows AS row
+            WITH row WHERE row.rel = 'CALLS'
+            MERGE (a:Symbol {name: row.source})
+            ON CREATE SET a.file = row.file
+            MERGE (b:Symbol {name: row.target})
+            ON CREATE SET b.file = row.target_file
+            MERGE (a)-[:CALLS]->(b)
+        """, rows= batch)
+
+    def remove_files(self, names):
         """
-        특정 파일과 연결된 모든 이웃 파일들의 이름을 찾아옴.
+        파일이 만든 연결(import, DEFINES, 파일 안 심볼에서 나가는 CALLS)을 지우고, 더 이상 아무와도 연결되지 않은 점을 지움
+        심볼은 Symbol.file 인덱스로 찾으므로 전체 점을 훑지 않음
         """
+        with self.driver.session() as session:
+            session.run("""
+                MATCH (s:Symbol) WHERE s.file IN $names
+                OPTIONAL MATCH (s)-[r:CALLS]->()
+                DELETE r
+            """, names= names)
+            session.run("""
+                UNWIND $names AS name
+                MATCH (a:File {name: name})
+                OPTIONAL MATCH (a)-[r]->()
+                DELETE r
+            """, names= names)
+            session.run("""
+                MATCH (s:Symbol) WHERE s.file IN $names AND NOT (s)--()
+                DELETE s
+            """, names= names)
+            session.run("""
+                UNWIND $names AS name
+                MATCH (a:File {name: name})
+                WHERE NOT (a)--()
+                DELETE a
+            """, names= names)
+
+    def related_nodes(self, name):
         with self.driver.session() as session:
             # 이 파일과 연결된 모든 점(Node)들을 찾아오는 쿼리를 실행함.
             result = session.run("""
-                MATCH (a:File  {name: $name})-[r]-(neighbor)
-                RETURN neighbor.name as name
-            """, name= file_name)
+                MATCH (a:File  {name: $name})-[r:REL]-(neighbor:File)
+                RETURN DISTINCT neighbor.name as name
+            """, name= name)
             # 결과물에서 이름만 리스트에 담아 돌려줌
-            return [record["name"] for record in result]
\ No newline at end of file
+            return [record["name"] for record in result]
+
+    def relations_of(self, name, limit):
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (a:File {name: $name})-[r:REL]-(neighbor:File)
+                RETURN DISTINCT startNode(r).name AS source, endNode(r).name AS target, r.type AS type
+                LIMIT $limit
+            """, name= name, limit= limit)
+            return [(record["source"], record["target"], record["type"]) for record in result]
+
+    def generation(self):
+        with self.driver.session() as session:
+            # 초기화(reset)로 모든 점이 지워지면 다음에 부를 때 새 값으로 다시 만들어짐
+            record = session.run("""
+                MERGE (m:GraphMeta {key: 'generation'})
+                ON CREATE SET m.value = randomUUID()
+                RETURN m.value AS value
+            """).single()
+            return record["value"]
+
+    def reset(self):
+        with self.driver.session() as session:
+            session.run("MATCH (n) DETACH DELETE n")
+
+
+class SQLiteBackend(GraphBackend):
+    """
+    서버 없이 프로세스 안에서 도는 저장소. 파일 사이 선 하나가 edges 표의 한 줄입니다.
+    (출발, 도착, 관계) 기본 키와 도착 쪽 인덱스가 있어서 양쪽 이웃을 모두 인덱스로 바로 찾습니다.
+    심볼 관계는 symbol_edges 표에 관계를 만든 파일(file)과 함께 따로 저장합니다.
+    path가 ":memory:" 이면 메모리에만 둡니다.
+    """
+    def __init__(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 화면과 실시간 동기화 스레드가 같이 쓰므로 잠금으로 한 번에 하나씩만 접근
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            # 여러 프로세스가 읽는 동안에도 쓸 수 있게 WAL 모드 사용
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def ensure_schema(self):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS edges (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    PRIMARY KEY (source, target, type)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS edges_target ON edges (target, source)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbol_edges (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    file TEXT NOT NULL,
+                    PRIMARY KEY (source, target, type)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS symbol_edges_file ON symbol_edges (file)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS symbol_edges_target ON symbol_edges (target, source)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', ?)", (uuid.uuid4().hex,))
+
+    def write_relations(self, rows):
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO edges (source, target, type) VALUES (:source, :target, :rel)", rows)
+
+    def write_symbol_relations(self, rows):
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO symbol_edges (source, target, type, file) VALUES (:source, :target, :rel, :file)", rows)
+
+    def remove_files(self, names):
+        with self._lock, self.conn:
+            for name in names:
+                self.conn.execute("DELETE FROM edges WHERE source = ?", (name,))
+                self.conn.execute("DELETE FROM symbol_edges WHERE file = ?", (name,))
+
+    def related_nodes(self, name):
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT target FROM edges WHERE source = ?
+                UNION
+                SELECT source FROM edges WHERE target = ?
+            """, (name, name)).fetchall()
+        return [row[0] for row in rows]
+
+    def relations_of(self, name, limit):
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT source, target, type FROM edges WHERE source = ?
+                UNION
+                SELECT source, target, type FROM edges WHERE target = ?
+                LIMIT ?
+            """, (name, name, limit)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def reset(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM edges")
+            self.conn.execute("DELETE FROM symbol_edges")
+            self.conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (uuid.uuid4().hex,))
+
+    def generation(self):
+        with self._lock:
+            return self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+
+def open_backend(uri, user=None, password=None):
+    """
+    주소 형식으로 저장소를 고릅니다.
+    - bolt://..., neo4j://...     : Neo4j 서버
+    - sqlite://경로, sqlite://:memory: : 프로세스 안 SQLite
+    """
+    if uri.startswith("sqlite://"):
+        return SQLiteBackend(uri[len("sqlite://"):])
+    return Neo4jBackend(uri, user, password)
+
+
+class CodeGraphManager:
+    """
+    코드 파일들이 서로 어떻게 호출되고 참조하는지 선으로 연결해 관리하는 클래스
+    실제 저장은 주소에 맞는 저장소(Neo4j 또는 SQLite)가 맡고, 이 클래스는 같은 사용법을 제공함
+    """
+    def __init__(self, uri, user= None, password= None, backend= None):
+        self.backend = backend or open_backend(uri, user, password)
+        self._schema_ready = False
+
+    def close(self):
+        self.backend.close()
+
+    def ensure_schema(self):
+        """저장소에 필요한 표/제약/인덱스를 만듦"""
+        self.backend.ensure_schema()
+        self._schema_ready = True
+
+    def _ready(self):
+        if not self._schema_ready:
+            self.ensure_schema()
+
+    def add_relation(self, source_file, target_file, rel_type= DEFAULT_REL):
+        """
+        파일 A가 파일 B를 참조한다는 연결 고리를 DB에 기록
+        """
+        self._ready()
+        self.backend.write_relations([{"source": source_file, "target": target_file, "rel": rel_type}])
+
+    def add_relations(self, relations, batch_size= 5000):
+        """
+        여러 개의 연결 고리를 한꺼번에 기록함
+        relations: (파일A, 파일B) 또는 (파일A, 파일B, 관계종류) 목록
+        batch_size 개씩 묶어서 저장소에 한 번에 보냄
+        """
+        self._ready()
+        batch = []
+        count = 0
+        for rel in relations:
+            source, target = rel[0], rel[1]
+            rel_type = rel[2] if len(rel) > 2 else DEFAULT_REL
+            batch.append({"source": source, "target": target, "rel": rel_type})
+            if len(batch) >= batch_size:
+                self.backend.write_relations(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.backend.write_relations(batch)
+            count += len(batch)
+        return count
+
+    def add_symbol_relations(self, relations, batch_size= 5000):
+        """
+        심볼 관계를 파일 관계와 따로 기록함 (파일 이웃 찾기, 의존성 지도에는 나오지 않음)
+        relations: (출발, 도착, 관계종류, 관계를 만든 파일) 목록. 심볼 이름은 "파일::정규화된 이름"
+        """
+        self._ready()
+        batch = []
+        count = 0
+        for source, target, rel_type, owner in relations:
+            batch.append({"source": source, "target": target, "rel": rel_type, "file": owner,
+                          "target_file": target.split("::", 1)[0]})
+            if len(batch) >= batch_size:
+                self.backend.write_symbol_relations(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.backend.write_symbol_relations(batch)
+            count += len(batch)
+        return count
+
+    def remove_files(self, source_files):
+        """
+        여러 파일의 연결 고리를 한 번에 지움
+        파일이 만든 심볼 관계(DEFINES, 파일 안 함수에서 나가는 CALLS)도 함께 지움
+        """
+        self._ready()
+        self.backend.remove_files(list(source_files))
+
+    def remove_file(self, source_file):
+        """
+        파일 A가 가진 연결 고리를 모두 지움 (파일이 삭제되거나 다시 학습될 때 사용)
+        """
+        self.remove_files([source_file])
+
+    def get_related_nodes(self, file_name):
+        """
+        특정 파일과 연결된 모든 이웃 파일들의 이름을 찾아옴.
+        """
+        self._ready()
+        return self.backend.related_nodes(file_name)
+
+    def get_context_map(self, file_name, limit= 50):
+        """
+        특정 파일이 들어가고 나오는 연결 관계를 "출발 --(관계)-- 도착" 문자열 목록으로 돌려줌 (의존성 지도 그리기용)
+        다른 파일이 이 파일을 import 하면 그 파일이 출발 쪽에 옴
+        """
+        self._ready()
+        return [format_relation(source, rel_type, target) for source, target, rel_type in self.backend.relations_of(file_name, limit)]
+
+    def generation(self):
+        """
+        그래프 DB의 세대 값. 초기화할 때마다 바뀜
+        (학습할 때 기록해 둔 값과 다르면 바뀌지 않은 파일의 연결도 다시 보내야 함)
+        """
+        self._ready()
+        return self.backend.generation()
+
+    def reset_graph(self):
+        """저장된 모든 점과 선을 지우고 세대 값을 바꿈"""
+        self._ready()
+        self.backend.reset()
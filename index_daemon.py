@@ -0,0 +1,138 @@
+# 프로젝트 폴더를 계속 지켜보다가, 파일이 바뀌면 바뀐 파일만 골라서 지식을 다시 저장하는 파일입니다.
+
+import os
+import time
+import threading
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+
+class _ChangeCollector(FileSystemEventHandler):
+    """
+    watchdog이 알려주는 파일 이벤트를 모아서 데몬에게 넘겨주는 클래스
+    """
+    def __init__(self, daemon):
+        super().__init__()
+        self.daemon = daemon
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        # 이동(move) 이벤트는 원래 경로(삭제)와 새 경로(추가)를 모두 반영해야 합니다.
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path:
+                self.daemon.notify(path)
+
+
+class LiveIndexDaemon:
+    """
+    프로젝트 폴더를 지켜보면서 VectorDB, 단어 색인, import 그래프를 작업 폴더와 같은 상태로 유지하는 클래스
+    브랜치 이동처럼 이벤트가 한꺼번에 몰려오면, 잠잠해질 때까지 기다렸다가 한 번에 처리합니다.
+    """
+    def __init__(self, indexer, root_dir, user_id, project_name, debounce=1.0, max_delay=10.0):
+        self.indexer = indexer
+        self.root_dir = os.path.abspath(root_dir)
+        self.user_id = user_id
+        self.project_name = project_name
+        # debounce: 마지막 이벤트 후 이만큼 조용하면 처리 / max_delay: 이벤트가 계속 와도 이 시간이 지나면 처리
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        self.persist_dir = os.path.join(indexer.db_path, user_id, project_name)
+
+        self.last_stats = None
+        self.last_error = None
+        self._pending = set()
+        self._first_event = None
+        self._last_event = None
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._worker = None
+
+    def notify(self, path):
+        """파일 경로 하나를 처리 대기열에 넣습니다. 같은 파일의 이벤트는 하나로 합쳐집니다."""
+        abs_path = os.path.abspath(path)
+        # DB 폴더가 프로젝트 안에 있을 때, DB 파일 변경을 다시 학습하는 일이 없도록 합니다.
+        if abs_path.startswith(os.path.abspath(self.persist_dir) + os.sep):
+            return
+        if not abs_path.endswith(self.indexer.EXTENSIONS):
+            return
+        rel_path = os.path.relpath(abs_path, self.root_dir).replace("\\", "/")
+        if rel_path.startswith(".."):
+            return
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_event = now
+            self._pending.add(rel_path)
+            self._last_event = now
+            self._cond.notify()
+
+    def start(self):
+        """폴더 감시와 처리 스레드를 시작합니다. 화면(요청 스레드)은 기다리지 않습니다."""
+        if self.is_running():
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._run, name=f"index-daemon-{self.project_name}", daemon=True)
+        self._worker.start()
+        self._observer = Observer()
+        self._observer.schedule(_ChangeCollector(self), self.root_dir, recursive=True)
+        self._observer.start()
+
+    def stop(self):
+        """감시를 멈추고, 남아 있는 변경은 마지막으로 한 번 처리합니다."""
+        self._stopped.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        with self._cond:
+            self._cond.notify()
+        if self._worker:
+            self._worker.join()
+            self._worker = None
+
+    def is_running(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    def _take_batch(self):
+        """
+        이벤트가 잠잠해질 때까지 기다린 뒤 모인 파일 목록을 꺼냅니다.
+        멈추라는 신호가 오면 남은 목록을 바로 꺼냅니다.
+        """
+        with self._cond:
+            while not self._stopped.is_set():
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                quiet_left = self._last_event + self.debounce - now
+                deadline_left = self._first_event + self.max_delay - now
+                wait = min(quiet_left, deadline_left)
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+            batch, self._pending = self._pending, set()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._process(batch)
+            if self._stopped.is_set():
+                with self._cond:
+                    if not self._pending:
+                        return
+
+    def _process(self, rel_paths):
+        """모인 파일들을 인덱서에 반영합니다. (import 그래프도 인덱서가 함께 고침)"""
+        try:
+            stats = self.indexer.index_files(self.root_dir, self.user_id, self.project_name, rel_paths)
+            self.last_stats = stats
+            self.last_error = None
+        except Exception as e:
+            # 한 번 실패해도 감시는 계속합니다. 실패한 파일은 학습 기록이 남지 않아 다음 전체 학습 때 다시 처리됩니다.
+            self.last_error = str(e)
+            print(f"실시간 동기화 실패: {e}")
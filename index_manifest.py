@@ -0,0 +1,93 @@
+# 프로젝트별로 어떤 파일을 언제, 어떤 내용으로 학습했는지 기록해 두는 파일입니다.
+# 다시 학습할 때 바뀐 파일만 골라내기 위해 사용합니다.
+
+import os
+import json
+import hashlib
+
+
+class IndexManifest:
+    """
+    프로젝트 하나의 학습 기록(파일 경로, 크기, 수정 시각, 내용 해시, 청크 id)을 관리하는 클래스
+    """
+    FILE_NAME = "index_manifest.json"
+    # 2: 청크 메타데이터에 chunk_id, 구문 단위 청크, 단어(BM25)/심볼 색인이 추가됨
+    VERSION = 2
+
+    def __init__(self, persist_dir):
+        self.path = os.path.join(persist_dir, self.FILE_NAME)
+        self.root_dir = None
+        self.files = {}
+        self.stale = False          # 예전 형식의 기록을 읽었으면 True (모든 파일을 다시 학습해야 함)
+        self.graph_generation = None    # 마지막으로 연결을 보낸 그래프 DB의 세대 (그래프 DB가 초기화되면 달라짐)
+
+    @staticmethod
+    def hash_bytes(data):
+        """파일 내용(bytes)의 sha256 해시를 돌려줍니다."""
+        return hashlib.sha256(data).hexdigest()
+
+    def load(self):
+        """
+        저장된 기록을 불러옵니다. 기록이 없으면 빈 기록으로 시작합니다.
+        형식(버전)이 다르면 예전 청크를 지울 수 있도록 파일 목록은 읽되 stale로 표시합니다.
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.root_dir = data.get("root_dir")
+        self.files = data.get("files", {})
+        self.graph_generation = data.get("graph_generation")
+        if data.get("version") != self.VERSION:
+            self.stale = True
+            return False
+        return True
+
+    def save(self):
+        """
+        기록을 임시 파일에 먼저 쓰고 교체해서, 중간에 멈춰도 기록이 깨지지 않게 합니다.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "root_dir": self.root_dir, "graph_generation": self.graph_generation, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+    def is_unchanged(self, rel_path, size, mtime):
+        """크기와 수정 시각이 기록과 같으면 내용을 읽지 않고도 그대로라고 판단합니다."""
+        entry = self.files.get(rel_path)
+        return entry is not None and entry["size"] == size and entry["mtime"] == mtime
+
+    def get(self, rel_path):
+        return self.files.get(rel_path)
+
+    def update(self, rel_path, size, mtime, content_hash, chunk_ids, imports=None):
+        """파일 하나의 학습 결과를 기록합니다."""
+        self.files[rel_path] = {
+            "size": size,
+            "mtime": mtime,
+            "sha256": content_hash,
+            "chunk_ids": list(chunk_ids),
+            "imports": list(imports or []),
+        }
+
+    def invalidate(self):
+        """
+        모든 파일을 '바뀜'으로 표시합니다. 청크 id는 남겨 두므로 다시 학습할 때 예전 청크가 지워집니다.
+        (새로 생긴 색인 파일이 없을 때 바뀌지 않은 파일까지 다시 학습하는 데 사용)
+        """
+        for entry in self.files.values():
+            entry["size"] = entry["mtime"] = entry["sha256"] = None
+        self.stale = False
+
+    def touch(self, rel_path, size, mtime):
+        """내용은 같고 수정 시각만 바뀐 파일의 기록을 갱신합니다."""
+        self.files[rel_path]["size"] = size
+        self.files[rel_path]["mtime"] = mtime
+
+    def remove(self, rel_path):
+        """기록에서 파일을 지우고, 지운 기록을 돌려줍니다."""
+        return self.files.pop(rel_path, None)
@@ -0,0 +1,105 @@
+# 파일 읽기 → 청크 나누기 → 임베딩 → 저장을 단계별로 흘려보내는 학습 파이프라인 파일입니다.
+# 전체 파일을 한꺼번에 메모리에 올리지 않고, 정해진 크기만큼씩 처리합니다.
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def read_files(candidates, workers=None, window=None):
+    """
+    [1단계] 여러 스레드로 파일을 미리 읽어 들입니다.
+    candidates: (상대경로, 전체경로, 크기, 수정시각) 목록
+    동시에 읽고 있는 파일 수를 window 개로 묶어서, 파일이 많아도 메모리가 늘지 않게 합니다.
+    결과는 넣은 순서대로 (상대경로, 크기, 수정시각, bytes 또는 None) 으로 돌려줍니다.
+    """
+    workers = workers or min(8, (os.cpu_count() or 1) * 2)
+    window = window or workers * 4
+
+    def _read(path):
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-read") as pool:
+        in_flight = deque()
+        for rel_path, path, size, mtime in candidates:
+            in_flight.append((rel_path, size, mtime, pool.submit(_read, path)))
+            if len(in_flight) >= window:
+                rel_path, size, mtime, future = in_flight.popleft()
+                yield rel_path, size, mtime, future.result()
+        while in_flight:
+            rel_path, size, mtime, future = in_flight.popleft()
+            yield rel_path, size, mtime, future.result()
+
+
+class BatchWriter:
+    """
+    [3, 4단계] 청크를 모아서 정해진 크기만큼씩 임베딩하고, 임베딩된 결과를 모아서 Chroma에 한 번에 씁니다.
+    임베딩 묶음은 청크 개수와 글자 수 두 기준으로 자릅니다. (긴 청크가 몰리면 작은 묶음으로)
+    """
+    def __init__(self, vector_db, embeddings, embed_batch_size=64, embed_batch_chars=64000, write_batch_size=512):
+        self.vector_db = vector_db
+        self.embeddings = embeddings
+        self.embed_batch_size = embed_batch_size
+        self.embed_batch_chars = embed_batch_chars
+        self.write_batch_size = write_batch_size
+
+        self._texts, self._ids, self._metas = [], [], []
+        self._chars = 0
+        self._write_buffer = ([], [], [], [])       # ids, embeddings, documents, metadatas
+        self._pending_deletes = []
+        self.embedded = 0
+        # 단계별 누적 시간 (초) - 학습이 끝나면 지표로 기록
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def delete(self, ids):
+        """지울 청크 id를 모아 둡니다. 새 청크를 쓰기 전에 먼저 지워집니다."""
+        self._pending_deletes.extend(ids)
+
+    def add(self, chunk_id, text, metadata):
+        self._texts.append(text)
+        self._ids.append(chunk_id)
+        self._metas.append(metadata)
+        self._chars += len(text)
+        if len(self._texts) >= self.embed_batch_size or self._chars >= self.embed_batch_chars:
+            self._embed()
+
+    def _embed(self):
+        if not self._texts:
+            return
+        started = time.perf_counter()
+        vectors = self.embeddings.embed_documents(self._texts)
+        self.embed_seconds += time.perf_counter() - started
+        ids, embeds, docs, metas = self._write_buffer
+        ids.extend(self._ids)
+        embeds.extend(vectors)
+        docs.extend(self._texts)
+        metas.extend(self._metas)
+        self.embedded += len(self._texts)
+        self._texts, self._ids, self._metas = [], [], []
+        self._chars = 0
+        if len(ids) >= self.write_batch_size:
+            self._write()
+
+    def _write(self):
+        # langchain Chroma 래퍼의 add_texts는 임베딩까지 다시 하므로, 이미 계산한 벡터는 컬렉션에 바로 씁니다.
+        started = time.perf_counter()
+        collection = self.vector_db._collection
+        if self._pending_deletes:
+            collection.delete(ids=self._pending_deletes)
+            self._pending_deletes = []
+        ids, embeds, docs, metas = self._write_buffer
+        if ids:
+            collection.upsert(ids=ids, embeddings=embeds, documents=docs, metadatas=metas)
+        self._write_buffer = ([], [], [], [])
+        self.write_seconds += time.perf_counter() - started
+
+    def flush(self):
+        """남아 있는 청크를 모두 임베딩하고 저장합니다."""
+        self._embed()
+        self._write()
@@ -1,6 +1,168 @@
-def main():
-    print("Hello from coding-tool!")
+# 화면 없이 질문 목록(JSONL)을 한꺼번에 처리하는 명령줄 실행 파일입니다.
+# 매일 밤 학습된 프로젝트에 같은 질문들을 던져서 답변과 응답 시간이 나빠지지 않았는지 확인하는 데 씁니다.
+#
+# 사용법: python main.py questions.jsonl -o answers.jsonl --model qwen2.5-coder:7b
+# 질문 한 줄 예: {"id": "q1", "question": "...", "user": "alice", "project": "default_project", "language": "Korean", "stack": "Streamlit"}
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from architect import DevelopmentArchitect
+from async_pipeline import AsyncQuestionPipeline
+from brain_manager import BrainManager
+from resource_cache import ResourceCache
+from telemetry import TELEMETRY
+
+OLLAMA_URL = "http://localhost:11434"
+DB_PATH = "./chroma_db"
+EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+
+
+def read_questions(path):
+    """JSONL 파일에서 질문을 읽습니다. 빈 줄은 건너뛰고, 잘못된 줄은 오류 결과로 남기도록 표시합니다."""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict) or not item.get("question"):
+                    raise ValueError("question 항목이 없습니다")
+            except ValueError as e:
+                item = {"error": f"{line_no}번째 줄: {e}"}
+            item.setdefault("id", line_no)
+            questions.append(item)
+    return questions
+
+
+class BatchRunner:
+    """
+    질문 목록을 화면과 같은 번역 → 검색 → 답변 → 재번역 흐름으로 처리하는 클래스
+    - 동시에 처리하는 질문 수는 workers 개로, Ollama로 가는 요청은 모델별 한도(limiter)로 제한합니다.
+    - 임베딩 모델, 벡터 DB 연결, 워크플로우는 ResourceCache에서 한 번만 만들어 모든 질문이 같이 씁니다.
+    """
+    def __init__(self, resources, brain_mgr, db_path, embed_model, default_model, workers=4, use_cache=False):
+        self.resources = resources
+        self.brain_mgr = brain_mgr
+        self.db_path = db_path
+        self.embed_model = embed_model
+        self.default_model = default_model
+        self.workers = workers
+        self.architect = DevelopmentArchitect()
+        # 회귀 확인용이라 기본은 답변 캐시를 쓰지 않음 (코드가 그대로면 이전 답변이 그대로 나와서 비교가 안 됨)
+        self.pipeline = AsyncQuestionPipeline(resources, limiter=resources.limiter,
+                                              answer_cache=resources.get_answer_cache(embed_model) if use_cache else None)
+
+    async def _answer_one(self, item):
+        user_id = item.get("user", "default_user")
+        project = item.get("project", "default_project")
+        model_name = item.get("model") or self.default_model
+        language = item.get("language", "Korean")
+        stack = item.get("stack", "")
+        result = {"id": item["id"], "user": user_id, "project": project, "model": model_name, "language": language,
+                  "stack": stack, "question": item.get("question")}
+        started = time.perf_counter()
+        try:
+            if "error" in item:
+                raise ValueError(item["error"])
+            db_dir = os.path.join(self.db_path, user_id, project)
+            if not os.path.exists(db_dir):
+                raise FileNotFoundError(f"학습된 프로젝트가 없습니다: {db_dir}")
+            # 벡터 DB 열기와 검색기 만들기는 파일을 읽으므로 이벤트 루프를 막지 않게 스레드에서 실행
+            retriever = await asyncio.to_thread(self.resources.get_retriever, user_id, project, db_dir, self.embed_model, 5)
+            symbols = await asyncio.to_thread(self.resources.get_symbol_index, user_id, project, db_dir)
+            info = await asyncio.to_thread(self.brain_mgr.get_model_info, model_name)
+            output = await self.pipeline.answer(
+                item["question"], model_name, language, stack, self.architect.get_system_prompt(stack), [retriever],
+                cache_scope=(user_id, project, model_name, stack), manifest_dir=db_dir,
+                symbol_index=symbols, context_length=info["num_ctx"])
+            result.update(answer=output["answer"], en_query=output["en_query"], cache_hit=output["cache_hit"],
+                          timings={k: round(v, 3) for k, v in output["timings"].items()}, error=None)
+        except Exception as e:
+            # 한 질문이 실패해도 나머지는 계속 처리함
+            result.update(answer=None, error=f"{type(e).__name__}: {e}")
+        result["latency_sec"] = round(time.perf_counter() - started, 3)
+        return result
+
+    async def run(self, questions, output_path):
+        """
+        질문을 동시에 workers 개씩 처리하고, 끝나는 대로 한 줄씩 결과 파일에 씁니다. (중간에 멈춰도 끝난 결과는 남음)
+        """
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def bounded(item):
+            async with semaphore:
+                return await self._answer_one(item)
+
+        results = []
+        with open(output_path, "w", encoding="utf-8") as out:
+            for future in asyncio.as_completed([bounded(item) for item in questions]):
+                result = await future
+                results.append(result)
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                status = "실패" if result["error"] else "완료"
+                print(f"[{len(results)}/{len(questions)}] {result['id']} {status} ({result['latency_sec']}초)")
+        return results
+
+
+def summarize(results, elapsed):
+    latencies = sorted(r["latency_sec"] for r in results if not r["error"])
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+    return {"questions": len(results), "errors": sum(1 for r in results if r["error"]),
+            "cache_hits": sum(1 for r in results if r.get("cache_hit")),
+            "p50_sec": pct(0.5), "p95_sec": pct(0.95), "elapsed_sec": round(elapsed, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="질문 JSONL 파일을 화면 없이 처리해서 답변과 응답 시간을 JSONL로 저장합니다.")
+    parser.add_argument("questions", help="질문 JSONL 파일 (question, user, project, language, stack)")
+    parser.add_argument("-o", "--output", default="answers.jsonl", help="결과 JSONL 파일")
+    parser.add_argument("--model", help="질문에 model 항목이 없을 때 쓸 Ollama 모델 (없으면 설치된 첫 모델)")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 질문 수")
+    parser.add_argument("--model-concurrency", type=int, default=2, help="모델마다 Ollama로 동시에 보낼 요청 수")
+    parser.add_argument("--ollama-url", default=OLLAMA_URL)
+    parser.add_argument("--db-path", default=DB_PATH)
+    parser.add_argument("--embed-model", default=EMBED_MODEL)
+    parser.add_argument("--keep-alive", default="30m", help="모델을 메모리에 남겨 둘 시간")
+    parser.add_argument("--use-cache", action="store_true", help="비슷한 질문의 답변 캐시 사용")
+    parser.add_argument("--metrics-dir", help="단계별 지표(metrics.prom, spans.jsonl)를 저장할 폴더")
+    args = parser.parse_args(argv)
+
+    brain_mgr = BrainManager(args.ollama_url, keep_alive=args.keep_alive)
+    default_model = args.model
+    if not default_model:
+        models = brain_mgr.get_available_models()
+        if not models:
+            print("Ollama 모델을 찾을 수 없습니다. --model 로 지정하거나 서버 주소를 확인하세요.")
+            return 1
+        default_model = models[0]
+
+    questions = read_questions(args.questions)
+    # 쓰일 모델을 미리 불러와서 첫 질문들이 모델 로딩을 기다리지 않게 함
+    for model_name in {q.get("model") or default_model for q in questions}:
+        brain_mgr.warm_up(model_name)
+
+    resources = ResourceCache(args.ollama_url, translation_cache_path=os.path.join(args.db_path, "translation_cache.sqlite3"),
+                              model_concurrency=args.model_concurrency, keep_alive=args.keep_alive)
+    runner = BatchRunner(resources, brain_mgr, args.db_path, args.embed_model, default_model, args.workers, args.use_cache)
+
+    started = time.perf_counter()
+    results = asyncio.run(runner.run(questions, args.output))
+    summary = summarize(results, time.perf_counter() - started)
+    print(json.dumps(summary, ensure_ascii=False))
+    if args.metrics_dir:
+        TELEMETRY.export(args.metrics_dir)
+    return 1 if summary["errors"] else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,10 +1,15 @@
 # AI가 질문을 받고 답변을 생성하는 전체 워크플로우를 관리하는 파일
 
+import time
+import asyncio
 from typing import TypedDict, List, Any
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_community.chat_models import ChatOllama
 from langgraph.graph import END, StateGraph
+from context_packer import ContextPacker, context_budget, estimate_tokens
+from telemetry import span
 
 class AgentState(TypedDict):
     """
@@ -15,26 +20,192 @@ class AgentState(TypedDict):
     answer: str
     stack: str
     system_prompt: str
+    prefetched: List[Any]
+    prefetched_for: str
+    sources: List[str]
+    cache_hit: bool
+    question_vector: List[float]
+    navigation_hit: bool
+    definitions: List[Any]
+
+def merge_documents(*doc_lists):
+    """
+    여러 검색 결과를 순서를 지키며 합치고, 같은 파일의 같은 내용은 한 번만 남김
+    """
+    seen = set()
+    merged = []
+    for docs in doc_lists:
+        for d in docs:
+            key = (d.metadata.get("source"), d.page_content)
+            if key in seen: continue
+            seen.add(key)
+            merged.append(d)
+    return merged
+
+def _streamed_text(mode, chunk):
+    """
+    워크플로우 stream 결과에서 화면에 보여줄 글자를 꺼냄
+    answer 단계의 토큰, 또는 캐시/심볼 색인에서 바로 꺼낸 답변 전체
+    """
+    if mode == "updates":
+        for node, flag in (("cache_lookup", "cache_hit"), ("navigate", "navigation_hit")):
+            update = chunk.get(node) or {}
+            if update.get(flag):
+                return update.get("answer")
+        return None
+    message, metadata = chunk
+    if metadata.get("langgraph_node") != "answer":
+        return None
+    return message.content
+
+class TokenTimer:
+    """
+    스트리밍 답변의 첫 토큰까지 걸린 시간(TTFT)과 전체 시간을 재는 클래스
+    - ttft: 모델이 첫 (영어) 토큰을 만들기까지의 시간
+    - ttfv: 번역을 거쳐 화면에 첫 글자가 보이기까지의 시간 (watch로 화면에 넘기는 스트림을 감싸서 잼)
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.first_visible = None
+        self.finished = None
+
+    def mark_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def mark_visible(self):
+        if self.first_visible is None:
+            self.first_visible = time.perf_counter()
+
+    def watch(self, stream):
+        """화면에 그릴 스트림을 그대로 흘려보내면서, 처음 나온 내용이 있는 조각의 시각을 기록합니다."""
+        for chunk in stream:
+            if chunk:
+                self.mark_visible()
+            yield chunk
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def ttft(self):
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def ttfv(self):
+        return None if self.first_visible is None else self.first_visible - self.started
+
+    @property
+    def total(self):
+        return None if self.finished is None else self.finished - self.started
 
 class AgenticBrain:
     """
     질문을 분석하고 지식을 찾아 답변을 만드는 클래스
     """
-    def __init__(self, model_name, base_url, retriever):
+    def __init__(self, model_name, base_url, retriever= None, context_length= 4096, llm= None, keep_alive= None):
         # 대화에 사용한 AI와 지식을 찾아올 검색기 준비
-        self.llm = ChatOllama(model= model_name, base_url= base_url, temperature= 0)
+        # 검색기는 실행할 때 config로 넘겨줄 수도 있어서, 컴파일한 워크플로우를 여러 프로젝트가 같이 쓸 수 있음
+        self.model_name = model_name
+        # llm을 넘기면 Ollama 대신 그 모델을 씀 (벤치마크용 가짜 모델 등)
+        # keep_alive: 답변 후에도 모델을 메모리에 남겨 둘 시간 (None이면 Ollama 기본값)
+        self.llm = llm or ChatOllama(model= model_name, base_url= base_url, temperature= 0, keep_alive= keep_alive)
         self.retriever = retriever
+        # 모델의 문맥 길이. 검색 결과를 이 길이 안에 들어가도록 정리해서 넣음 (config의 context_length가 우선)
+        self.context_length = context_length
+        self.packer = ContextPacker()
+
+    def _pack_context(self, state, docs, config):
+        """검색 결과를 합치고 중복을 없앤 뒤, 모델 문맥 길이에 맞춰 파일/줄 정보와 함께 담음"""
+        configurable = (config or {}).get("configurable", {})
+        context_length = configurable.get("context_length") or self.context_length
+        budget = context_budget(context_length, state.get("system_prompt"), state["question"])
+        with span("workflow.pack_context", candidates=len(docs), budget_tokens=budget) as s:
+            context, sources = self.packer.pack(docs, budget)
+            s.set(context_tokens=estimate_tokens(context), files=len(sources))
+        return {"context": context, "sources": sources}
+
+    def _get_retriever(self, config):
+        configurable = (config or {}).get("configurable", {})
+        return configurable.get("retriever") or self.retriever
+
+    def _get_retrievers(self, config):
+        """여러 검색기를 함께 쓰고 싶으면 config의 "retrievers" 목록으로 넘겨줌"""
+        configurable = (config or {}).get("configurable", {})
+        return configurable.get("retrievers") or [self._get_retriever(config)]
 
-    def search_node(self, state: AgentState):
+    def cache_lookup_node(self, state: AgentState, config: RunnableConfig = None):
+        """
+        [0단계] 비슷한 질문에 대한 답변이 캐시에 있으면 바로 돌려주고, 검색과 답변 작성을 건너뜀
+        config: answer_cache(SemanticAnswerCache), cache_scope(사용자, 프로젝트, 모델, 스택), manifest_dir(학습 기록 폴더)
+        """
+        configurable = (config or {}).get("configurable", {})
+        cache = configurable.get("answer_cache")
+        if cache is None:
+            return {"cache_hit": False}
+        with span("workflow.cache_lookup") as s:
+            answer, vector = cache.lookup(state["question"], configurable.get("cache_scope"), configurable.get("manifest_dir"))
+            s.set(cache_hit=answer is not None)
+        if answer is not None:
+            print("캐시된 답변 사용")
+            return {"answer": answer, "cache_hit": True}
+        return {"cache_hit": False, "question_vector": vector}
+
+    def cache_store_node(self, state: AgentState, config: RunnableConfig = None):
+        """[3단계] 새로 만든 답변을 참고한 파일 목록과 함께 캐시에 저장함"""
+        configurable = (config or {}).get("configurable", {})
+        cache = configurable.get("answer_cache")
+        if cache is not None and state.get("answer"):
+            with span("workflow.cache_store"):
+                cache.store(state["question"], state["answer"], configurable.get("cache_scope"), state.get("sources") or [],
+                            configurable.get("manifest_dir"), vector= state.get("question_vector"))
+        return {}
+
+    def navigate_node(self, state: AgentState, config: RunnableConfig = None):
+        """
+        [0.5단계] "누가 X를 호출하지?" 같은 코드 탐색 질문은 심볼 색인만으로 바로 답함 (AI 호출 없음)
+        탐색 질문이 아니면 질문에 나온 심볼의 정의 코드를 찾아 두어, 검색 결과보다 앞에 넣음
+        config: symbol_index(SymbolIndex)
+        """
+        configurable = (config or {}).get("configurable", {})
+        symbols = configurable.get("symbol_index")
+        if symbols is None:
+            return {"navigation_hit": False}
+        with span("workflow.navigate") as s:
+            answer = symbols.answer(state["question"])
+            s.set(navigation_hit=answer is not None)
+            if answer is not None:
+                print("심볼 색인으로 바로 답변")
+                return {"answer": answer, "navigation_hit": True}
+            definitions = symbols.definition_documents(state["question"])
+            s.set(definitions=len(definitions))
+        return {"navigation_hit": False, "definitions": definitions}
+
+    def search_node(self, state: AgentState, config: RunnableConfig = None):
         """[1단계] 질문관 관련된 코드를 검색기에서 찾아옴"""
         print("지식 검색 중")
-        docs = self.retriever.invoke(state["question"])
-        context = "\n\n".join([d.page_content for d in docs])
-        return {"context": context}
+        with span("workflow.search") as s:
+            docs = [d for r in self._get_retrievers(config) for d in r.invoke(state["question"])]
+            s.set(chunks=len(docs))
+        docs = merge_documents(state.get("definitions") or [], state.get("prefetched") or [], docs)
+        return self._pack_context(state, docs, config)
+
+    async def asearch_node(self, state: AgentState, config: RunnableConfig = None):
+        """
+        [1단계 - 비동기] 여러 검색기를 동시에 실행하고, 미리 찾아둔 문서(prefetched)와 합쳐서 중복을 없앰
+        """
+        retrievers = self._get_retrievers(config)
+        # 번역된 질문이 원래 질문과 같다면 미리 찾아둔 결과를 그대로 씀
+        if state.get("prefetched_for") == state["question"]:
+            retrievers = []
+        with span("workflow.search", retrievers=len(retrievers)) as s:
+            results = await asyncio.gather(*[r.ainvoke(state["question"]) for r in retrievers])
+            s.set(chunks=sum(len(r) for r in results))
+        docs = merge_documents(state.get("definitions") or [], state.get("prefetched") or [], *results)
+        return self._pack_context(state, docs, config)
     
-    def answer_node(self, state: AgentState):
-        """[2단계] 찾은 지식과 역할을 바탕으로 답변을 작성함"""
-        print("답변 작성 중")
+    def _answer_chain(self):
         prompt = PromptTemplate(
             template="""{system_prompt}
 
@@ -47,20 +218,111 @@ class AgenticBrain:
             """,
             input_variables= ["system_prompt", "context", "question"]
         )
-        chain = prompt | self.llm | StrOutputParser()
-        answer = chain.invoke(state)
+        return prompt | self.llm | StrOutputParser()
+
+    def _generate(self, state, config, s):
+        """
+        답변을 토큰 단위로 받아 모으면서, 첫 토큰까지(prefill)와 그 뒤 생성 시간을 나눠서 기록함
+        stream으로 받아도 config를 넘기면 워크플로우의 "messages" 스트림으로 토큰이 그대로 흘러나감
+        """
+        started = time.perf_counter()
+        first = None
+        parts = []
+        for token in self._answer_chain().stream(state, config= config):
+            if first is None:
+                first = time.perf_counter()
+            parts.append(token)
+        self._record_generation(s, started, first, parts)
+        return "".join(parts)
+
+    async def _agenerate(self, state, config, s):
+        started = time.perf_counter()
+        first = None
+        parts = []
+        async for token in self._answer_chain().astream(state, config= config):
+            if first is None:
+                first = time.perf_counter()
+            parts.append(token)
+        self._record_generation(s, started, first, parts)
+        return "".join(parts)
+
+    @staticmethod
+    def _record_generation(s, started, first, parts):
+        finished = time.perf_counter()
+        first = first or finished
+        s.set(prefill_ms=round((first - started) * 1000, 1), generation_ms=round((finished - first) * 1000, 1),
+              stream_chunks=len(parts), output_tokens=estimate_tokens("".join(parts)))
+
+    def answer_node(self, state: AgentState, config: RunnableConfig = None):
+        """[2단계] 찾은 지식과 역할을 바탕으로 답변을 작성함"""
+        print("답변 작성 중")
+        # config를 넘겨야 워크플로우를 stream 으로 실행할 때 토큰이 바깥까지 흘러나감
+        configurable = (config or {}).get("configurable", {})
+        limiter = configurable.get("limiter")
+        with span("workflow.answer", model=self.model_name, prompt_tokens=estimate_tokens(state.get("context") or "")) as s:
+            if limiter is None:
+                answer = self._generate(state, config, s)
+            else:
+                waited = time.perf_counter()
+                with limiter.slot(self.model_name):
+                    s.set(queue_ms=round((time.perf_counter() - waited) * 1000, 1))
+                    answer = self._generate(state, config, s)
         return {"answer": answer}
-    
+
+    async def aanswer_node(self, state: AgentState, config: RunnableConfig = None):
+        """[2단계 - 비동기] config에 limiter가 있으면 모델별 동시 요청 한도 안에서 답변을 작성함"""
+        configurable = (config or {}).get("configurable", {})
+        limiter = configurable.get("limiter")
+        with span("workflow.answer", model=self.model_name, prompt_tokens=estimate_tokens(state.get("context") or "")) as s:
+            if limiter is None:
+                answer = await self._agenerate(state, config, s)
+            else:
+                waited = time.perf_counter()
+                async with limiter.aslot(self.model_name):
+                    s.set(queue_ms=round((time.perf_counter() - waited) * 1000, 1))
+                    answer = await self._agenerate(state, config, s)
+        return {"answer": answer}
+
+    @staticmethod
+    def stream_answer(flow, inputs, config= None, timer= None):
+        """
+        컴파일된 워크플로우를 실행하면서, answer 단계에서 생성되는 답변 토큰을 나오는 대로 하나씩 돌려줌
+        timer(TokenTimer)를 넘기면 첫 토큰까지 걸린 시간을 기록함
+        """
+        for mode, chunk in flow.stream(inputs, config= config, stream_mode= ["messages", "updates"]):
+            text = _streamed_text(mode, chunk)
+            if not text: continue
+            if timer: timer.mark_token()
+            yield text
+
+    @staticmethod
+    async def astream_answer(flow, inputs, config= None, timer= None):
+        """stream_answer 의 비동기 버전"""
+        async for mode, chunk in flow.astream(inputs, config= config, stream_mode= ["messages", "updates"]):
+            text = _streamed_text(mode, chunk)
+            if not text: continue
+            if timer: timer.mark_token()
+            yield text
+
     def build_workflow(self):
         """AI의 사고 흐름을 하나로 연결함"""
         flow = StateGraph(AgentState)
         
-        flow.add_node("search", self.search_node)
-        flow.add_node("answer", self.answer_node)
+        # 같은 워크플로우를 invoke/stream(동기)과 ainvoke/astream(비동기) 양쪽으로 실행할 수 있게 두 버전을 함께 등록
+        flow.add_node("cache_lookup", self.cache_lookup_node)
+        flow.add_node("navigate", self.navigate_node)
+        flow.add_node("search", RunnableLambda(self.search_node, afunc= self.asearch_node, name= "search"))
+        flow.add_node("answer", RunnableLambda(self.answer_node, afunc= self.aanswer_node, name= "answer"))
+        flow.add_node("cache_store", self.cache_store_node)
         
-        flow.set_entry_point("search")
+        flow.set_entry_point("cache_lookup")
         
+        # 캐시에 답이 있으면 바로 끝내고, 없으면 심볼 탐색 → 검색 → 답변 → 캐시 저장 순서로 진행
+        # 심볼 색인만으로 답할 수 있는 탐색 질문도 바로 끝냄
+        flow.add_conditional_edges("cache_lookup", lambda state: "hit" if state.get("cache_hit") else "miss", {"hit": END, "miss": "navigate"})
+        flow.add_conditional_edges("navigate", lambda state: "hit" if state.get("navigation_hit") else "miss", {"hit": END, "miss": "search"})
         flow.add_edge("search", "answer")
-        flow.add_edge("answer", END)
+        flow.add_edge("answer", "cache_store")
+        flow.add_edge("cache_store", END)
 
         return flow.compile()
\ No newline at end of file
@@ -0,0 +1,172 @@
+# 임베딩 모델, 벡터 DB 연결, 완성된 워크플로우처럼 만들기 비싼 객체들을 한 번만 만들어 돌려쓰게 하는 파일입니다.
+
+import os
+import threading
+from collections import OrderedDict
+
+from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+from langchain_community.vectorstores import Chroma
+
+from concurrency import ModelConcurrencyLimiter
+from rag_agent import AgenticBrain
+from retrieval_engine import HybridRetriever, LexicalIndex
+from compact_graph import CompactGraph
+from code_indexer import CodebaseIndexer
+from semantic_cache import SemanticAnswerCache
+from symbol_index import SymbolIndex
+from translator import LanguageTranslator, TranslationCache
+from telemetry import span
+
+
+def _dir_size(path):
+    """폴더 안 파일 크기의 합. 벡터 DB가 메모리에 올라갔을 때의 크기를 어림하는 데 사용합니다."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+class ResourceCache:
+    """
+    프로세스 전체에서 공유하는 자원 보관소
+    - 임베딩 모델: 모델 이름마다 하나
+    - 벡터 DB 연결: (사용자, 프로젝트)마다 하나, 오래 안 쓴 것부터 정리 (개수/메모리 상한)
+    - 워크플로우: AI 모델 이름마다 하나 (검색기는 실행할 때 넘겨줌)
+    """
+    def __init__(self, base_url, max_stores=8, max_store_bytes=2 * 1024 ** 3, translation_cache_path=None, model_concurrency=2, keep_alive=None):
+        self.base_url = base_url
+        # 모든 세션이 같은 Ollama 서버를 나눠 쓰므로, 모델별 동시 요청 한도도 하나를 공유합니다.
+        self.limiter = ModelConcurrencyLimiter(model_concurrency)
+        # 번역 결과는 모델이 달라도 같은 저장소에 (모델 이름을 키에 넣어) 보관합니다.
+        self.translation_cache = TranslationCache(translation_cache_path)
+        self.max_stores = max_stores
+        # 번역/답변 요청마다 Ollama에 넘길 keep_alive (미리 불러온 모델이 기본 5분 뒤 내려가지 않게 함)
+        self.keep_alive = keep_alive
+        self.max_store_bytes = max_store_bytes
+
+        self._lock = threading.RLock()
+        self._embeddings = {}
+        self._stores = OrderedDict()      # (user_id, project) -> (db_dir, vector_db, 크기)
+        self._retrievers = {}             # (user_id, project) -> HybridRetriever
+        self._symbol_indexes = {}         # (user_id, project) -> SymbolIndex
+        self._workflows = {}
+        self._answer_caches = {}
+        self._translators = {}
+
+    def get_embeddings(self, model_name):
+        """임베딩 모델은 디스크에서 읽어오는 데 몇 초가 걸리므로 이름마다 한 번만 불러옵니다."""
+        with self._lock:
+            if model_name not in self._embeddings:
+                with span("embeddings.load", model=model_name):
+                    self._embeddings[model_name] = HuggingFaceBgeEmbeddings(model_name=model_name)
+            return self._embeddings[model_name]
+
+    def get_vector_store(self, user_id, project, db_dir, embed_model):
+        """
+        (사용자, 프로젝트)의 벡터 DB 연결을 돌려줍니다. 최근에 쓴 순서를 기억해서 상한을 넘으면 오래된 것부터 닫습니다.
+        """
+        key = (user_id, project)
+        with self._lock:
+            cached = self._stores.get(key)
+            if cached and cached[0] == db_dir:
+                self._stores.move_to_end(key)
+                return cached[1]
+
+            embeddings = self.get_embeddings(embed_model)
+            with span("vector_store.open", project=project) as s:
+                vector_db = Chroma(persist_directory=db_dir, embedding_function=embeddings)
+                size = _dir_size(db_dir)
+                s.set(bytes=size)
+            self._stores[key] = (db_dir, vector_db, size)
+            self._stores.move_to_end(key)
+            self._evict(keep=key)
+            return vector_db
+
+    def _evict(self, keep):
+        """개수 상한이나 메모리 상한을 넘으면 가장 오래 안 쓴 연결부터 버립니다. 방금 쓴 연결은 남깁니다."""
+        while len(self._stores) > 1:
+            total = sum(size for _, _, size in self._stores.values())
+            if len(self._stores) <= self.max_stores and total <= self.max_store_bytes:
+                break
+            oldest = next(iter(self._stores))
+            if oldest == keep:
+                break
+            self._stores.pop(oldest)
+            self._retrievers.pop(oldest, None)
+            self._symbol_indexes.pop(oldest, None)
+
+    def drop_vector_store(self, user_id, project):
+        """다시 학습한 프로젝트처럼 연결을 새로 열어야 할 때 사용합니다."""
+        with self._lock:
+            self._stores.pop((user_id, project), None)
+            self._retrievers.pop((user_id, project), None)
+            self._symbol_indexes.pop((user_id, project), None)
+
+    def get_retriever(self, user_id, project, db_dir, embed_model, k=5):
+        """
+        벡터 검색 + BM25 + 그래프 확장 + 재순위를 묶은 검색기를 돌려줍니다.
+        단어 색인과 import 그래프는 파일이 바뀌면 검색할 때 알아서 다시 읽습니다.
+        """
+        key = (user_id, project)
+        with self._lock:
+            vector_db = self.get_vector_store(user_id, project, db_dir, embed_model)
+            retriever = self._retrievers.get(key)
+            if retriever is None or retriever.vector_db is not vector_db:
+                lexical = LexicalIndex(db_dir)
+                lexical.load()
+                graph_path = os.path.join(db_dir, CodebaseIndexer.COMPACT_GRAPH_FILE)
+                retriever = HybridRetriever(vector_db=vector_db, lexical_index=lexical, graph_builder=CompactGraph(), graph_path=graph_path, k=k)
+                self._retrievers[key] = retriever
+            return retriever
+
+    def get_symbol_index(self, user_id, project, db_dir):
+        """
+        정의/참조/호출 색인을 돌려줍니다. 색인 파일이 바뀌었으면 새 객체로 읽어서 보관소의 것을 통째로 바꿉니다.
+        여러 세션/스레드가 같은 객체를 읽으므로, 한 번 돌려준 객체는 고치지 않습니다.
+        """
+        key = (user_id, project)
+        try:
+            mtime = os.path.getmtime(os.path.join(db_dir, SymbolIndex.FILE_NAME))
+        except OSError:
+            mtime = None
+        with self._lock:
+            symbols = self._symbol_indexes.get(key)
+            if symbols is not None and os.path.dirname(symbols.path) == db_dir and symbols.loaded_mtime == mtime:
+                return symbols
+        # 파일 읽기는 보관소 잠금 밖에서 하고, 다 읽은 객체만 한 번에 끼워 넣음
+        fresh = SymbolIndex(db_dir)
+        fresh.load()
+        with self._lock:
+            self._symbol_indexes[key] = fresh
+        return fresh
+
+    def get_workflow(self, model_name):
+        """
+        모델 이름마다 한 번만 워크플로우를 만들고 컴파일합니다.
+        검색기는 실행할 때 config={"configurable": {"retriever": ...}} 로 넘겨줍니다.
+        """
+        with self._lock:
+            if model_name not in self._workflows:
+                brain = AgenticBrain(model_name, self.base_url, keep_alive=self.keep_alive)
+                self._workflows[model_name] = brain.build_workflow()
+            return self._workflows[model_name]
+
+    def get_answer_cache(self, embed_model):
+        """
+        비슷한 질문의 답변을 재사용하는 캐시. 질문 임베딩을 만들 모델마다 하나씩 둡니다.
+        범위(사용자, 프로젝트, 모델, 스택)는 캐시 안에서 구분하므로 모든 세션이 같이 씁니다.
+        """
+        with self._lock:
+            if embed_model not in self._answer_caches:
+                self._answer_caches[embed_model] = SemanticAnswerCache(self.get_embeddings(embed_model))
+            return self._answer_caches[embed_model]
+
+    def get_translator(self, model_name):
+        with self._lock:
+            if model_name not in self._translators:
+                self._translators[model_name] = LanguageTranslator(model_name, self.base_url, self.translation_cache, keep_alive=self.keep_alive)
+            return self._translators[model_name]
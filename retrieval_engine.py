@@ -0,0 +1,275 @@
+# 벡터 검색(의미)과 BM25 단어 검색(정확한 이름)을 함께 쓰고, 관련 파일까지 넓힌 뒤 다시 순위를 매기는 검색 엔진 파일입니다.
+
+import os
+import re
+import math
+import json
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from flashrank import Ranker, RerankRequest
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+|[가-힣]+")
+CAMEL_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text):
+    """
+    코드용 단어 나누기. 식별자는 통째로(getUserName) 한 번, 조각(get, user, name)으로 한 번 더 넣어서
+    정확한 이름 검색과 부분 단어 검색이 모두 되게 합니다.
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        lower = word.lower()
+        tokens.append(lower)
+        parts = [p.lower() for piece in word.split("_") for p in CAMEL_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    청크마다 단어 빈도를 기록한 역색인(inverted index)으로 BM25 점수를 계산하는 클래스
+    Chroma 폴더 안에 JSON으로 저장하고, 청크 id 단위로 추가/삭제할 수 있습니다.
+    """
+    FILE_NAME = "lexical_index.json"
+    VERSION = 1
+
+    def __init__(self, persist_dir, k1=1.5, b=0.75):
+        self.path = os.path.join(persist_dir, self.FILE_NAME)
+        self.k1 = k1
+        self.b = b
+        self.docs = {}          # 청크 id -> {"source": 파일, "len": 단어 수, "tf": {단어: 빈도}}
+        self.postings = {}      # 단어 -> {청크 id: 빈도}
+        self.total_len = 0
+        self.loaded_mtime = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.VERSION:
+            return False
+        self.docs = {}
+        self.postings = {}
+        self.total_len = 0
+        for chunk_id, doc in data["docs"].items():
+            self._insert(chunk_id, doc["source"], doc["tf"])
+        self.loaded_mtime = os.path.getmtime(self.path)
+        return True
+
+    def reload_if_changed(self):
+        """다른 곳(실시간 동기화 등)에서 색인 파일을 고쳤다면 다시 읽습니다."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime != self.loaded_mtime:
+            return self.load()
+        return False
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "docs": {i: {"source": d["source"], "tf": d["tf"]} for i, d in self.docs.items()}}, f)
+        os.replace(tmp_path, self.path)
+        self.loaded_mtime = os.path.getmtime(self.path)
+
+    def _insert(self, chunk_id, source, tf):
+        length = sum(tf.values())
+        self.docs[chunk_id] = {"source": source, "len": length, "tf": tf}
+        self.total_len += length
+        for term, count in tf.items():
+            self.postings.setdefault(term, {})[chunk_id] = count
+
+    def add(self, chunk_id, text, source):
+        if chunk_id in self.docs:
+            self.remove([chunk_id])
+        self._insert(chunk_id, source, dict(Counter(tokenize(text))))
+
+    def remove(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            doc = self.docs.pop(chunk_id, None)
+            if doc is None:
+                continue
+            self.total_len -= doc["len"]
+            for term in doc["tf"]:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(chunk_id, None)
+                    if not posting:
+                        del self.postings[term]
+
+    def search(self, query, k=20, sources=None):
+        """
+        BM25 점수가 높은 순서로 (청크 id, 점수) 목록을 돌려줍니다. sources를 주면 그 파일들 안에서만 찾습니다.
+        """
+        n = len(self.docs)
+        if n == 0:
+            return []
+        avg_len = self.total_len / n or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                doc = self.docs[chunk_id]
+                if sources is not None and doc["source"] not in sources:
+                    continue
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * doc["len"] / avg_len))
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+# 같은 검색기를 여러 세션이 같이 쓰므로, 색인/그래프 파일을 다시 읽는 일은 한 번에 하나씩만 함
+_RELOAD_LOCK = threading.Lock()
+
+
+def _doc_key(doc):
+    """
+    문서의 청크 id. 학습할 때 메타데이터에 넣어 둔 chunk_id를 먼저 씁니다.
+    (Chroma의 similarity_search는 Document.id를 채우지 않으므로 BM25 결과와 같은 키가 되려면 메타데이터가 필요함)
+    둘 다 없으면(예전에 학습한 DB) 파일과 내용으로 대신 만듭니다.
+    """
+    chunk_id = doc.metadata.get("chunk_id")
+    if chunk_id:
+        return chunk_id
+    if getattr(doc, "id", None):
+        return doc.id
+    digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:12]
+    return f"{doc.metadata.get('source')}#{digest}"
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    [검색 순서]
+    1. 벡터 검색과 BM25 검색을 각각 fetch_k 개씩 실행
+    2. 두 순위를 RRF(reciprocal rank fusion)로 합침
+    3. 상위 파일들과 import로 연결된 파일에서 질문과 가장 맞는 청크를 하나씩 더 가져옴
+    4. flashrank로 전체 후보를 다시 순위 매겨서 k 개만 돌려줌
+    """
+    vector_db: Any
+    lexical_index: LexicalIndex
+    graph_builder: Any = None           # get_related_files 와 load 를 가진 그래프 (CompactGraph 또는 CodeGraphBuiler)
+    graph_path: Optional[str] = None
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    graph_files: int = 3
+    use_reranker: bool = True
+    ranker: Any = None
+
+    def _reload(self):
+        """
+        단어 색인과 그래프 파일이 바뀌었으면 새 객체로 읽은 뒤 통째로 바꿔 끼웁니다.
+        다른 스레드가 검색 중인 예전 객체(그래프의 mmap 포함)는 건드리지 않고, 다 쓰면 저절로 정리됩니다.
+        """
+        with _RELOAD_LOCK:
+            lexical = self.lexical_index
+            try:
+                mtime = os.path.getmtime(lexical.path)
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != lexical.loaded_mtime:
+                fresh = LexicalIndex(os.path.dirname(lexical.path), lexical.k1, lexical.b)
+                if fresh.load():
+                    self.lexical_index = fresh
+
+            graph = self.graph_builder
+            if graph is not None and self.graph_path and os.path.exists(self.graph_path):
+                mtime = os.path.getmtime(self.graph_path)
+                if getattr(graph, "loaded_mtime", None) != mtime:
+                    fresh = type(graph)()
+                    fresh.load(self.graph_path)
+                    fresh.loaded_mtime = mtime
+                    self.graph_builder = fresh
+
+    def _fetch(self, chunk_ids):
+        """청크 id로 Chroma에서 본문을 가져옵니다."""
+        if not chunk_ids:
+            return []
+        result = self.vector_db.get(ids=list(chunk_ids), include=["documents", "metadatas"])
+        by_id = {i: Document(page_content=text, metadata=meta or {}, id=i)
+                 for i, text, meta in zip(result["ids"], result["documents"], result["metadatas"])}
+        return [by_id[i] for i in chunk_ids if i in by_id]
+
+    def _fuse(self, query):
+        """
+        벡터 검색과 BM25 검색 결과를 RRF로 합칩니다.
+        (청크 id -> 문서, 청크 id -> 합친 점수)를 돌려주며, 두 검색에 모두 걸린 청크는 한 번만 들어가고 점수가 더해집니다.
+        """
+        vector_docs = self.vector_db.similarity_search(query, k=self.fetch_k)
+        lexical_hits = self.lexical_index.search(query, self.fetch_k)
+        pool = {_doc_key(d): d for d in vector_docs}
+        missing = [chunk_id for chunk_id, _ in lexical_hits if chunk_id not in pool]
+        for d in self._fetch(missing):
+            pool[_doc_key(d)] = d
+
+        fused = {}
+        for rank, d in enumerate(vector_docs):
+            key = _doc_key(d)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical_hits):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        return pool, fused
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        self._reload()
+
+        # 1 + 2. 벡터 검색과 BM25 검색 결과를 RRF로 합침
+        pool, fused = self._fuse(query)
+        ranked = [key for key, _ in sorted(fused.items(), key=lambda x: x[1], reverse=True) if key in pool]
+        candidates = ranked[:self.fetch_k]
+
+        # 3. 그래프 확장: 상위 파일과 연결된 파일의 가장 관련 있는 청크를 후보에 추가
+        graph = self.graph_builder
+        if graph is not None:
+            top_sources = []
+            for key in candidates:
+                source = pool[key].metadata.get("source")
+                if source and source not in top_sources:
+                    top_sources.append(source)
+                if len(top_sources) >= self.graph_files:
+                    break
+            neighbors = {n for s in top_sources for n in graph.get_related_files(s)}
+            neighbors -= set(top_sources)
+            extra = []
+            for neighbor in neighbors:
+                hits = self.lexical_index.search(query, 1, sources={neighbor})
+                if hits and hits[0][0] not in pool:
+                    extra.append(hits[0][0])
+            for d in self._fetch(extra):
+                key = _doc_key(d)
+                pool[key] = d
+                candidates.append(key)
+
+        # 4. flashrank 재순위
+        docs = [pool[key] for key in candidates]
+        return self._rerank(query, docs)[:self.k]
+
+    def _rerank(self, query, docs):
+        if not self.use_reranker or len(docs) <= 1:
+            return docs
+        try:
+            if self.ranker is None:
+                self.ranker = Ranker()
+            passages = [{"id": i, "text": d.page_content} for i, d in enumerate(docs)]
+            results = self.ranker.rerank(RerankRequest(query=query, passages=passages))
+        except Exception as e:
+            # 재순위 모델을 쓸 수 없으면 RRF 순서를 그대로 사용합니다.
+            print(f"재순위 생략: {e}")
+            self.use_reranker = False
+            return docs
+        return [docs[r["id"]] for r in results]
@@ -0,0 +1,107 @@
+# 비슷한 질문이 다시 들어오면 검색과 답변 생성을 건너뛰고, 이전 답변을 돌려주는 의미 기반 캐시 파일입니다.
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+
+from index_manifest import IndexManifest
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class SemanticAnswerCache:
+    """
+    질문 임베딩이 충분히 비슷하면(코사인 유사도 >= threshold) 같은 질문으로 보고 답변을 재사용하는 클래스
+    - 범위(scope): (사용자, 프로젝트, 모델, 기술 스택)이 같은 항목끼리만 비교합니다.
+    - 무효화: 답변을 만들 때 참고한 파일의 내용 해시를 기억해 두고, 그 파일이 다시 학습되어 해시가 바뀌면 버립니다.
+    - 정리: 오래된 항목(ttl)과 오래 안 쓴 항목(LRU, max_entries)을 지웁니다.
+    """
+    def __init__(self, embeddings, threshold=0.92, ttl=24 * 3600, max_entries=512):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()       # 번호 -> 항목
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._manifests = {}                # 학습 기록 폴더 -> (수정시각, {파일: 해시})
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "evictions": 0}
+
+    def file_versions(self, manifest_dir):
+        """프로젝트 학습 기록에서 {파일: 내용 해시}를 읽어옵니다. 기록 파일이 바뀌었을 때만 다시 읽습니다."""
+        manifest = IndexManifest(manifest_dir)
+        try:
+            mtime = os.path.getmtime(manifest.path)
+        except OSError:
+            return {}
+        cached = self._manifests.get(manifest_dir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        manifest.load()
+        versions = {path: entry["sha256"] for path, entry in manifest.files.items()}
+        self._manifests[manifest_dir] = (mtime, versions)
+        return versions
+
+    def lookup(self, question, scope, manifest_dir=None):
+        """
+        비슷한 이전 질문의 답변을 찾아 돌려줍니다. 없으면 None을 돌려줍니다.
+        돌려줄 때 질문 임베딩도 함께 돌려주어, 저장할 때 다시 계산하지 않게 합니다.
+        """
+        vector = _normalize(self.embeddings.embed_query(question))
+        versions = self.file_versions(manifest_dir) if manifest_dir else None
+        now = time.time()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id, entry in list(self._entries.items()):
+                if now - entry["created"] > self.ttl:
+                    del self._entries[entry_id]
+                    self.stats["evictions"] += 1
+                    continue
+                if entry["scope"] != scope:
+                    continue
+                if versions is not None and any(versions.get(src) != sha for src, sha in entry["sources"].items()):
+                    # 참고했던 파일이 바뀌었거나 지워졌으므로 이 답변은 더 이상 믿을 수 없음
+                    del self._entries[entry_id]
+                    self.stats["invalidations"] += 1
+                    continue
+                score = sum(a * b for a, b in zip(vector, entry["vector"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.stats["misses"] += 1
+                return None, vector
+            self._entries.move_to_end(best_id)
+            self.stats["hits"] += 1
+            return self._entries[best_id]["answer"], vector
+
+    def store(self, question, answer, scope, sources, manifest_dir=None, vector=None):
+        """답변을 저장합니다. sources: 답변을 만들 때 참고한 파일 목록"""
+        if vector is None:
+            vector = _normalize(self.embeddings.embed_query(question))
+        versions = self.file_versions(manifest_dir) if manifest_dir else {}
+        with self._lock:
+            self._entries[self._next_id] = {
+                "scope": scope,
+                "vector": vector,
+                "answer": answer,
+                "sources": {src: versions.get(src) for src in sources},
+                "created": time.time(),
+            }
+            self._next_id += 1
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
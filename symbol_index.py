@@ -0,0 +1,363 @@
+# 파이썬 코드의 함수/클래스 정의, 이름이 쓰인 곳, 함수 호출 관계를 기록해 두는 심볼 색인 파일입니다.
+# "누가 translate 를 호출하지?", "AgentState 는 어디서 쓰이지?" 같은 질문을 AI 없이 바로 답할 수 있게 합니다.
+
+import os
+import re
+import ast
+import json
+
+from langchain_core.documents import Document
+
+IDENTIFIER_PATTERN = re.compile(r"`([^`]+)`|([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)")
+SYMBOL = r"`?([A-Za-z_][A-Za-z0-9_.]*)`?(?:\(\))?"
+
+# (질문 종류, 정규식) - 번역된 영어 질문과 한국어 원문 질문을 모두 알아듣게 함
+NAVIGATION_PATTERNS = [
+    ("callers", re.compile(rf"\b(?:who|what|which \w+)\s+(?:calls|invokes|uses the function)\s+{SYMBOL}", re.I)),
+    ("callers", re.compile(rf"\bcallers\s+of\s+{SYMBOL}", re.I)),
+    ("callers", re.compile(rf"\bwhere\s+(?:is|are)\s+{SYMBOL}\s+(?:called|invoked)", re.I)),
+    ("callees", re.compile(rf"\bwhat\s+(?:does|do)\s+{SYMBOL}\s+call", re.I)),
+    ("definition", re.compile(rf"\bwhere\s+(?:is|are)\s+{SYMBOL}\s+(?:defined|declared|implemented)", re.I)),
+    ("definition", re.compile(rf"\b(?:definition|declaration)\s+of\s+{SYMBOL}", re.I)),
+    ("references", re.compile(rf"\bwhere\s+(?:is|are)\s+{SYMBOL}\s+(?:used|referenced)", re.I)),
+    ("references", re.compile(rf"\b(?:usages?|references?|uses)\s+of\s+{SYMBOL}", re.I)),
+    ("references", re.compile(rf"\bwho\s+uses\s+{SYMBOL}", re.I)),
+    ("callers", re.compile(rf"{SYMBOL}\s*(?:을|를)?\s*(?:호출하는|부르는|어디서\s*호출)")),
+    ("definition", re.compile(rf"{SYMBOL}\s*(?:은|는|이|가)?\s*(?:어디(?:에|서)?\s*)?정의")),
+    ("references", re.compile(rf"{SYMBOL}\s*(?:은|는|이|가|을|를)?\s*(?:어디(?:에|서)?\s*)?(?:사용|쓰이)")),
+]
+
+
+# 심볼 자리에 걸려도 심볼이 아닌 영어 단어 ("Which file calls the database?")
+STOP_WORDS = {"a", "an", "the", "this", "that", "these", "those", "my", "our", "your", "its", "it", "function", "method", "class"}
+
+
+def parse_navigation_query(question, known=None):
+    """
+    코드 탐색 질문이면 (종류, 심볼 이름)을 돌려줍니다. 아니면 None.
+    종류: definition(정의 위치), references(쓰인 곳), callers(호출하는 곳), callees(호출하는 함수)
+    known(이름 -> 참/거짓)을 주면 색인에 있는 이름이 나올 때까지 모든 후보를 보고, 없으면 None.
+    """
+    for intent, pattern in NAVIGATION_PATTERNS:
+        for match in pattern.finditer(question):
+            symbol = match.group(1).rstrip(".")
+            if symbol.lower() in STOP_WORDS:
+                continue
+            if known is None or known(symbol):
+                return intent, symbol
+    return None
+
+
+def _sentence_initial(text, pos):
+    """pos 위치의 단어가 문장 첫 단어인지 (대문자로 시작해도 코드 이름이 아닐 가능성이 큼)"""
+    before = text[:pos]
+    stripped = before.rstrip()
+    return not stripped or stripped[-1] in ".?!:" or "\n" in before[len(stripped):]
+
+
+def _callee_name(node):
+    """호출식의 함수 이름 (foo() -> foo, self.a.bar() -> bar)"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    """
+    AST를 돌면서 정의/참조/호출을 모읍니다. 지금 어느 함수(클래스) 안에 있는지를 scope로 기억합니다.
+    """
+    def __init__(self):
+        self.scope = []
+        self.kinds = []
+        self.aliases = {}
+        self.defs = []
+        self.refs = set()
+        self.calls = set()
+
+    def _current(self):
+        return ".".join(self.scope) or "<module>"
+
+    def _define(self, node, kind):
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        qualified = ".".join(self.scope + [node.name])
+        self.defs.append([qualified, kind, start, getattr(node, "end_lineno", None) or node.lineno])
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.scope.append(node.name)
+        self.kinds.append(kind)
+        for child in ast.iter_child_nodes(node):
+            if child not in node.decorator_list:
+                self.visit(child)
+        self.scope.pop()
+        self.kinds.pop()
+
+    def visit_ClassDef(self, node):
+        self._define(node, "class")
+
+    def visit_FunctionDef(self, node):
+        self._define(node, "method" if self.kinds and self.kinds[-1] == "class" else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ImportFrom(self, node):
+        # from a import B as C 로 가져왔다면, C 가 쓰인 곳을 B 가 쓰인 곳으로 기록함
+        for alias in node.names:
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+
+    def visit_Assign(self, node):
+        if not self.scope:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.defs.append([target.id, "variable", node.lineno, getattr(node, "end_lineno", None) or node.lineno])
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.refs.add((self.aliases.get(node.id, node.id), node.lineno, self._current()))
+
+    def visit_Attribute(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.refs.add((node.attr, node.lineno, self._current()))
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        name = _callee_name(node.func)
+        if name:
+            self.calls.add((self._current(), self.aliases.get(name, name), node.lineno))
+        self.generic_visit(node)
+
+
+def extract_symbols(text):
+    """
+    파이썬 소스에서 정의, 참조, 호출 목록을 뽑아냅니다. 문법 오류가 있으면 None.
+    - defs:  [정규화된 이름(Class.method), 종류, 시작 줄, 끝 줄]
+    - refs:  [이름, 줄, 쓰인 곳(정의 이름)]
+    - calls: [호출한 곳(정의 이름), 호출된 이름, 줄]
+    """
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    visitor = _SymbolVisitor()
+    visitor.visit(tree)
+    return {
+        "defs": visitor.defs,
+        "refs": [list(r) for r in sorted(visitor.refs)],
+        "calls": [list(c) for c in sorted(visitor.calls)],
+    }
+
+
+class SymbolIndex:
+    """
+    파일별 심볼 기록을 JSON으로 저장하고, 불러올 때 이름 -> 정의/참조/호출한 곳 역방향 색인을 미리 만들어 두는 클래스
+    파일 단위로 추가/삭제할 수 있어서 바뀐 파일만 고칠 수 있습니다.
+    """
+    FILE_NAME = "symbol_index.json"
+    VERSION = 1
+
+    def __init__(self, persist_dir):
+        self.path = os.path.join(persist_dir, self.FILE_NAME)
+        self.root_dir = None
+        self.files = {}             # 파일 -> {"defs": [...], "refs": [...], "calls": [...]}
+        self.definitions_by_name = {}   # 짧은 이름 -> [(파일, 정규화된 이름, 종류, 시작 줄, 끝 줄)]
+        self.references_by_name = {}    # 이름 -> {(파일, 줄, 쓰인 곳)}
+        self.callers_by_name = {}       # 호출된 이름 -> {(파일, 호출한 곳, 줄)}
+        self.loaded_mtime = None
+
+    # ---------- 저장/불러오기 ----------
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.VERSION:
+            return False
+        self.root_dir = data.get("root_dir")
+        self.files = {}
+        self.definitions_by_name = {}
+        self.references_by_name = {}
+        self.callers_by_name = {}
+        for rel_path, symbols in data.get("files", {}).items():
+            self._insert(rel_path, symbols)
+        self.loaded_mtime = os.path.getmtime(self.path)
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "root_dir": self.root_dir, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+        self.loaded_mtime = os.path.getmtime(self.path)
+
+    # ---------- 고치기 ----------
+    def _insert(self, rel_path, symbols):
+        self.files[rel_path] = symbols
+        for qualified, kind, start, end in symbols["defs"]:
+            short = qualified.rsplit(".", 1)[-1]
+            self.definitions_by_name.setdefault(short, []).append((rel_path, qualified, kind, start, end))
+        for name, line, scope in symbols["refs"]:
+            self.references_by_name.setdefault(name, set()).add((rel_path, line, scope))
+        for scope, callee, line in symbols["calls"]:
+            self.callers_by_name.setdefault(callee, set()).add((rel_path, scope, line))
+
+    def remove_file(self, rel_path):
+        symbols = self.files.pop(rel_path, None)
+        if symbols is None:
+            return
+        for qualified, *_ in symbols["defs"]:
+            short = qualified.rsplit(".", 1)[-1]
+            entries = [e for e in self.definitions_by_name.get(short, []) if e[0] != rel_path]
+            if entries:
+                self.definitions_by_name[short] = entries
+            else:
+                self.definitions_by_name.pop(short, None)
+        self._discard(self.references_by_name, {name for name, _, _ in symbols["refs"]}, rel_path)
+        self._discard(self.callers_by_name, {callee for _, callee, _ in symbols["calls"]}, rel_path)
+
+    @staticmethod
+    def _discard(index, names, rel_path):
+        for name in names:
+            entries = {e for e in index.get(name, ()) if e[0] != rel_path}
+            if entries:
+                index[name] = entries
+            else:
+                index.pop(name, None)
+
+    def update_file(self, rel_path, text):
+        """파이썬 파일 하나의 심볼을 다시 뽑아서 바꿔 끼웁니다."""
+        self.remove_file(rel_path)
+        if not rel_path.endswith(".py"):
+            return
+        symbols = extract_symbols(text)
+        if symbols is not None:
+            self._insert(rel_path, symbols)
+
+    # ---------- 찾기 ----------
+    def definitions(self, symbol):
+        """
+        이름으로 정의를 찾습니다. Class.method 처럼 점이 있으면 정규화된 이름의 끝부분이 맞는 것만 돌려줍니다.
+        """
+        short = symbol.rsplit(".", 1)[-1]
+        found = self.definitions_by_name.get(short, [])
+        if "." in symbol:
+            found = [d for d in found if d[1] == symbol or d[1].endswith("." + symbol)]
+        return sorted(found)
+
+    def references(self, symbol):
+        return sorted(self.references_by_name.get(symbol.rsplit(".", 1)[-1], ()))
+
+    def callers(self, symbol):
+        return sorted(self.callers_by_name.get(symbol.rsplit(".", 1)[-1], ()))
+
+    def callees(self, symbol):
+        """이 함수(들) 안에서 호출하는 이름 목록을 (파일, 호출된 이름, 줄)로 돌려줍니다."""
+        found = []
+        for rel_path, qualified, *_ in self.definitions(symbol):
+            for scope, callee, line in self.files[rel_path]["calls"]:
+                if scope == qualified or scope.startswith(qualified + "."):
+                    found.append((rel_path, callee, line))
+        return sorted(set(found))
+
+    def resolve_callee(self, rel_path, callee):
+        """
+        호출된 짧은 이름을 색인에 있는 함수/클래스 정의로 바꿉니다. [(파일, 정규화된 이름)]
+        같은 파일 안의 정의를 먼저 찾고, 없으면 프로젝트 전체에서 하나뿐인 정의만 씁니다.
+        (print, len 같은 내장 함수나 여러 곳에 같은 이름이 있는 get 같은 이름은 버림)
+        """
+        found = [(f, q) for f, q, kind, *_ in self.definitions_by_name.get(callee, ()) if kind != "variable"]
+        local = [d for d in found if d[0] == rel_path]
+        if local:
+            return local
+        return found if len(found) == 1 else []
+
+    def relations(self, rel_paths):
+        """
+        GraphDB에 넣을 심볼 관계를 (출발, 도착, 관계, 관계를 만든 파일)로 만듭니다. 심볼 점 이름은 "파일::정규화된 이름" 입니다.
+        - (파일, 심볼, "DEFINES", 파일)
+        - (심볼, 호출된 심볼, "CALLS", 파일): 색인에 정의가 있는 함수/클래스를 부른 경우만
+        """
+        for rel_path in rel_paths:
+            symbols = self.files.get(rel_path)
+            if symbols is None:
+                continue
+            for qualified, *_ in symbols["defs"]:
+                yield (rel_path, f"{rel_path}::{qualified}", "DEFINES", rel_path)
+            for scope, callee, _ in symbols["calls"]:
+                if scope == "<module>":
+                    continue
+                for target_path, target in self.resolve_callee(rel_path, callee):
+                    yield (f"{rel_path}::{scope}", f"{target_path}::{target}", "CALLS", rel_path)
+
+    # ---------- 질문에 바로 답하기 ----------
+    def answer(self, question, limit=30):
+        """
+        코드 탐색 질문이면 색인만으로 답을 만들어 돌려줍니다. 모르는 심볼이거나 탐색 질문이 아니면 None.
+        """
+        # 색인에 정의가 있는 이름일 때만 바로 답하고, 아니면 None을 돌려서 일반 검색(RAG)으로 넘김
+        parsed = parse_navigation_query(question, known=lambda name: bool(self.definitions(name)))
+        if parsed is None:
+            return None
+        intent, symbol = parsed
+        definitions = self.definitions(symbol)
+
+        if intent == "definition":
+            found = definitions
+            header = f"`{symbol}` is defined in {len(found)} place(s)"
+            rows = [f"- `{q}` ({kind}) — {f}:{start}-{end}" for f, q, kind, start, end in found]
+        elif intent == "callers":
+            found = self.callers(symbol)
+            header = f"`{symbol}` is called from {len(found)} place(s)"
+            rows = [f"- `{scope}` — {f}:{line}" for f, scope, line in found]
+        elif intent == "callees":
+            found = self.callees(symbol)
+            header = f"`{symbol}` calls {len(found)} name(s)"
+            rows = [f"- `{callee}` — {f}:{line}" for f, callee, line in found]
+        else:
+            found = self.references(symbol)
+            header = f"`{symbol}` is referenced in {len(found)} place(s)"
+            rows = [f"- `{scope}` — {f}:{line}" for f, line, scope in found]
+        lines = [header + (":" if rows else ".")] + rows[:limit]
+        if len(rows) > limit:
+            lines.append(f"- ... (showing first {limit})")
+        return "\n".join(lines)
+
+    def definition_documents(self, question, limit=3):
+        """
+        질문에 나온 심볼의 정의 코드를 파일에서 그대로 읽어 Document로 돌려줍니다. (검색 결과 앞에 넣을 용도)
+        `백틱` 으로 감싼 이름, 또는 밑줄/점/중간 대문자가 들어가 코드 이름처럼 보이는 단어만 봅니다.
+        대문자로 시작하는 단어(Translator)는 문장 첫 단어가 아닐 때만 봅니다. 색인에 정의가 없는 이름은 건너뜁니다.
+        """
+        if not self.root_dir:
+            return []
+        docs = []
+        seen = set()
+        for match in IDENTIFIER_PATTERN.finditer(question):
+            quoted, word = match.groups()
+            name = (quoted or word).strip().rstrip("()")
+            code_like = "_" in name or "." in name or any(c.isupper() for c in name[1:])
+            capitalized = name[:1].isupper() and not _sentence_initial(question, match.start())
+            if not quoted and not code_like and not capitalized:
+                continue
+            for rel_path, qualified, kind, start, end in self.definitions(name):
+                if (rel_path, qualified) in seen or kind == "variable":
+                    continue
+                seen.add((rel_path, qualified))
+                try:
+                    with open(os.path.join(self.root_dir, rel_path), "r", encoding="utf-8") as f:
+                        body = f.read().splitlines()[start - 1:end]
+                except (OSError, UnicodeDecodeError):
+                    continue
+                docs.append(Document(page_content="\n".join(body), metadata={
+                    "source": rel_path, "kind": "definition", "qualified_name": qualified,
+                    "start_line": start, "end_line": end,
+                }))
+                if len(docs) >= limit:
+                    return docs
+        return docs
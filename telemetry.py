@@ -0,0 +1,207 @@
+# 질문 처리와 학습의 단계별 소요 시간, 토큰 수, 청크 수, 캐시 적중을 기록하는 파일입니다.
+# 화면(사이드바)에 바로 보여주고, Prometheus 텍스트와 JSON lines 파일로 내보낼 수 있습니다.
+
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Prometheus 히스토그램 구간 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("growcode_span", default=None)
+
+
+class Span:
+    """
+    진행 중인 구간 하나. with 블록 안에서 set()으로 토큰 수, 청크 수, 캐시 적중 같은 값을 붙입니다.
+    """
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.started = time.time()
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _Stat:
+    """구간 이름 하나의 누적 통계"""
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.recent = deque(maxlen=256)     # 최근 소요 시간 (백분위 계산용)
+        self.sums = {}                      # 숫자 속성의 합 (토큰 수, 청크 수 등)
+        self.flags = {}                     # 참/거짓 속성이 참이었던 횟수 (캐시 적중 등)
+        self.last = None
+
+    def add(self, seconds, attrs, error):
+        self.count += 1
+        self.total += seconds
+        self.errors += 1 if error else 0
+        self.recent.append(seconds)
+        self.last = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        for key, value in attrs.items():
+            if isinstance(value, bool):
+                self.flags[key] = self.flags.get(key, 0) + (1 if value else 0)
+            elif isinstance(value, (int, float)):
+                self.sums[key] = self.sums.get(key, 0) + value
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Telemetry:
+    """
+    구간(span) 기록기. 프로세스 전체에서 TELEMETRY 하나를 같이 씁니다.
+    - span(): with 블록의 시간을 재서 기록 (안쪽 구간은 바깥 구간의 자식으로 이어짐)
+    - record(): 이미 잰 시간을 기록 (학습처럼 여러 단계가 섞여 흘러가는 경우)
+    - sink_path를 정하면 끝난 구간을 JSON lines 파일에 한 줄씩 덧붙임
+    """
+    def __init__(self, max_spans=1000, sink_path=None):
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max_spans)
+        self._stats = {}
+        self.sink_path = sink_path
+
+    def open_sink(self, path):
+        """끝난 구간을 계속 덧붙일 JSON lines 파일을 정합니다."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.sink_path = path
+
+    @contextmanager
+    def span(self, name, **attrs):
+        parent = _current_span.get()
+        current = Span(name, attrs, parent)
+        token = _current_span.set(current)
+        started = time.perf_counter()
+        try:
+            yield current
+        except BaseException as e:
+            current.error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(current, time.perf_counter() - started)
+
+    def record(self, name, seconds, **attrs):
+        """with 블록 없이 잰 시간을 지금 진행 중인 구간의 자식으로 기록합니다."""
+        current = Span(name, attrs, _current_span.get())
+        current.started = time.time() - seconds
+        self._finish(current, seconds)
+
+    def _finish(self, span, seconds):
+        entry = {
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start": round(span.started, 6),
+            "duration_ms": round(seconds * 1000, 3),
+            "attrs": span.attrs,
+            "error": span.error,
+        }
+        with self._lock:
+            self._spans.append(entry)
+            self._stats.setdefault(span.name, _Stat()).add(seconds, span.attrs, span.error)
+            if self.sink_path:
+                try:
+                    with open(self.sink_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                except OSError as e:
+                    print(f"지표 파일 기록 실패: {e}")
+
+    # ---------- 보기 ----------
+    def recent_spans(self, limit=50):
+        with self._lock:
+            return list(self._spans)[-limit:][::-1]
+
+    def summary(self):
+        """구간 이름별 횟수, 평균/중앙값/p95 (밀리초), 숫자 속성 합계, 참이었던 횟수 목록 (화면 표시용)"""
+        rows = []
+        with self._lock:
+            for name, stat in sorted(self._stats.items()):
+                row = {
+                    "span": name,
+                    "count": stat.count,
+                    "avg_ms": round(stat.total / stat.count * 1000, 1),
+                    "p50_ms": round(stat.percentile(0.5) * 1000, 1),
+                    "p95_ms": round(stat.percentile(0.95) * 1000, 1),
+                    "last_ms": round(stat.last * 1000, 1),
+                    "errors": stat.errors,
+                }
+                row.update({key: round(value, 3) for key, value in stat.sums.items()})
+                row.update({key: value for key, value in stat.flags.items()})
+                rows.append(row)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._stats.clear()
+
+    # ---------- 내보내기 ----------
+    def to_prometheus(self, prefix="growcode"):
+        """Prometheus 텍스트 형식 (구간별 소요 시간 히스토그램, 오류 수, 숫자 속성 합계, 참 횟수)"""
+        lines = [f"# HELP {prefix}_span_duration_seconds Duration of instrumented stages.",
+                 f"# TYPE {prefix}_span_duration_seconds histogram"]
+        counters = {}
+        with self._lock:
+            for name, stat in sorted(self._stats.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, count in zip(BUCKETS, stat.buckets):
+                    lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{label}",le="+Inf"}} {stat.count}')
+                lines.append(f'{prefix}_span_duration_seconds_sum{{span="{label}"}} {stat.total:.6f}')
+                lines.append(f'{prefix}_span_duration_seconds_count{{span="{label}"}} {stat.count}')
+                counters.setdefault("errors", []).append((label, stat.errors))
+                for key, value in list(stat.sums.items()) + list(stat.flags.items()):
+                    counters.setdefault(key, []).append((label, value))
+        for key, values in sorted(counters.items()):
+            metric = f"{prefix}_span_{''.join(c if c.isalnum() else '_' for c in key)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f'{metric}{{span="{label}"}} {value}' for label, value in values]
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self):
+        """기억하고 있는 최근 구간들을 JSON lines 문자열로"""
+        with self._lock:
+            spans = list(self._spans)
+        return "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in spans)
+
+    def export(self, directory):
+        """metrics.prom 과 spans.jsonl 을 폴더에 씁니다. (대시보드 수집용)"""
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for file_name, text in (("metrics.prom", self.to_prometheus()), ("spans.jsonl", self.to_jsonl())):
+            path = os.path.join(directory, file_name)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            paths[file_name] = path
+        return paths
+
+
+TELEMETRY = Telemetry()
+
+
+def span(name, **attrs):
+    """TELEMETRY.span 의 줄임"""
+    return TELEMETRY.span(name, **attrs)
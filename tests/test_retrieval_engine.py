@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("flashrank")
+
+from langchain_core.documents import Document
+
+from retrieval_engine import HybridRetriever, LexicalIndex
+
+
+class FakeVectorDB:
+    """Chroma처럼 similarity_search 결과의 Document.id를 비워서 돌려주는 가짜 벡터 DB"""
+    def __init__(self, chunks, ranking):
+        self.chunks = chunks
+        self.ranking = ranking
+
+    def similarity_search(self, query, k=4):
+        return [Document(page_content=self.chunks[i], metadata={"source": i.split("::")[0], "chunk_id": i})
+                for i in self.ranking[:k]]
+
+    def get(self, ids, include=None):
+        ids = [i for i in ids if i in self.chunks]
+        return {"ids": ids, "documents": [self.chunks[i] for i in ids],
+                "metadatas": [{"source": i.split("::")[0], "chunk_id": i} for i in ids]}
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    chunks = {
+        "auth.py::0": "def get_user_name(user):\n    return user.name",
+        "auth.py::1": "def check_password(user, password):\n    return user.password == password",
+        "db.py::0": "def connect(url):\n    return open_connection(url)",
+    }
+    lexical = LexicalIndex(str(tmp_path))
+    for chunk_id, text in chunks.items():
+        lexical.add(chunk_id, text, chunk_id.split("::")[0])
+    vector_db = FakeVectorDB(chunks, ["auth.py::0", "db.py::0"])
+    return HybridRetriever(vector_db=vector_db, lexical_index=lexical, k=5, use_reranker=False)
+
+
+def test_chunk_hit_by_both_retrievers_is_fused(retriever):
+    pool, fused = retriever._fuse("get_user_name")
+    # 벡터 1위 + BM25 1위 점수가 한 키로 더해짐
+    assert fused["auth.py::0"] == pytest.approx(2.0 / (retriever.rrf_k + 1))
+    assert set(pool) == set(fused)
+
+
+def test_chunk_hit_by_both_retrievers_is_returned_once(retriever):
+    docs = retriever.invoke("get_user_name")
+    keys = [d.metadata["chunk_id"] for d in docs]
+    assert keys[0] == "auth.py::0"
+    assert len(keys) == len(set(keys))
@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from symbol_index import SymbolIndex, parse_navigation_query
+
+SOURCES = {
+    "db.py": "class Index:\n    pass\n\n\ndef connect(url):\n    return Index()\n",
+    "service.py": "from db import connect\n\n\nclass CodebaseIndexer:\n    def run(self):\n        return connect('x')\n",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    symbols = SymbolIndex(str(tmp_path / "db"))
+    symbols.root_dir = str(tmp_path)
+    for rel_path, text in SOURCES.items():
+        (tmp_path / rel_path).write_text(text, encoding="utf-8")
+        symbols.update_file(rel_path, text)
+    return symbols
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Who calls connect?", ("callers", "connect")),
+    ("Where is `CodebaseIndexer` defined?", ("definition", "CodebaseIndexer")),
+    ("What does run call?", ("callees", "run")),
+    ("connect 를 호출하는 곳은?", ("callers", "connect")),
+    ("Index 는 어디에 정의되어 있어?", ("definition", "Index")),
+])
+def test_parse_navigation_query(question, expected):
+    assert parse_navigation_query(question) == expected
+
+
+def test_parse_skips_english_filler_words():
+    assert parse_navigation_query("Which file calls the database?") is None
+
+
+def test_parse_requires_known_symbol():
+    known = {"connect"}.__contains__
+    assert parse_navigation_query("Who uses the database?", known=known) is None
+    assert parse_navigation_query("Who calls connect?", known=known) == ("callers", "connect")
+
+
+def test_answer_falls_through_for_unknown_symbol(index):
+    assert index.answer("Which file calls the database?") is None
+    assert index.answer("Who calls open_database?") is None
+
+
+def test_answer_for_known_symbol(index):
+    answer = index.answer("Who calls connect?")
+    assert answer.startswith("`connect` is called from 1 place(s)")
+    assert "service.py:6" in answer
+
+
+def test_definition_documents_ignore_sentence_initial_word(index):
+    # 문장 첫 단어 "Index"는 같은 이름의 클래스가 있어도 심볼로 보지 않음
+    assert index.definition_documents("Index the project again, please.") == []
+
+
+def test_definition_documents_for_code_like_names(index):
+    docs = index.definition_documents("How does CodebaseIndexer use the `Index` class?")
+    assert [d.metadata["qualified_name"] for d in docs] == ["CodebaseIndexer", "Index"]
+    assert docs[1].page_content.startswith("class Index:")
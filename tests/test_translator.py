@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_community")
+
+from translator import detect_language
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("How do I add a new route?", "English"),
+    ("새 라우트는 어떻게 추가하나요?", "Korean"),
+    ("FastAPI 라우터에 미들웨어를 추가하는 방법", "Korean"),
+    ("新しいルートを追加する方法", "Japanese"),
+    ("如何添加新的路由", "Chinese"),
+    ("12345 !!!", None),
+])
+def test_detect_language(text, expected):
+    assert detect_language(text) == expected
+
+
+def test_single_hangul_character_does_not_make_text_korean():
+    text = "The greeting label is set to 안 in the settings file, see config.py for details."
+    assert detect_language(text) == "English"
+
+
+def test_korean_question_with_english_identifiers():
+    assert detect_language("get_user_name 함수는 어디에서 호출되나요?") == "Korean"
+
+
+def test_mostly_english_with_a_korean_phrase():
+    text = "Use the Translator class to translate the answer into 한국어 before rendering it."
+    assert detect_language(text) == "English"
@@ -1,32 +1,253 @@
 # AI와의 대화를 위해 다양한 언어를 번역해주는 번역사 역할을 하는 파일
 
+import re
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.chat_models import ChatOllama
+from context_packer import estimate_tokens
+from telemetry import span
+
+# 번역하지 않고 그대로 둘 코드 조각 (``` 블록과 `인라인 코드`)
+CODE_PATTERN = re.compile(r"```.*?```|`[^`\n]+`", re.DOTALL)
+PLACEHOLDER = "[[CODE_{}]]"
+PLACEHOLDER_PATTERN = re.compile(r"\[\[CODE_(\d+)\]\]")
+# 문장이 끝나는 자리 (마침표/물음표/느낌표 뒤의 공백, 또는 줄바꿈)
+SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+
+
+def detect_language(text, min_share=0.3):
+    """
+    글자의 종류(한글, 가나, 한자, 알파벳)를 세어서 어떤 언어로 쓰인 글인지 추측합니다.
+    한글(또는 가나+한자, 한자)이 전체 글자의 min_share 이상일 때만 그 언어로 봅니다.
+    판단할 글자가 없으면 None을 돌려줍니다.
+    """
+    hangul = kana = han = latin = 0
+    for ch in text:
+        code = ord(ch)
+        if 0xAC00 <= code <= 0xD7A3 or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+            hangul += 1
+        elif 0x3040 <= code <= 0x30FF:
+            kana += 1
+        elif 0x4E00 <= code <= 0x9FFF:
+            han += 1
+        elif ch.isascii() and ch.isalpha():
+            latin += 1
+
+    letters = hangul + kana + han + latin
+    if letters == 0:
+        return None
+    # 한국어/일본어 문장에도 영어 용어가 섞이고, 영어 답변에도 한글 이름 몇 글자가 섞이므로 글자 비율로 정합니다.
+    if hangul / letters >= min_share and hangul >= kana:
+        return "Korean"
+    if kana and (kana + han) / letters >= min_share:
+        return "Japanese"
+    if han / letters >= min_share:
+        return "Chinese"
+    return "English"
+
+
+class TranslationCache:
+    """
+    번역 결과를 기억해 두는 저장소
+    최근 결과는 메모리(LRU)에, 전체 결과는 디스크(SQLite)에 저장해서 다시 실행해도 재사용합니다.
+    """
+    def __init__(self, path=None, max_entries=1024):
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model_name, text, source_lang, target_lang):
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model_name}|{text_hash}|{source_lang}|{target_lang}"
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT value FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO translations (key, value) VALUES (?, ?)", (key, value))
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
 
 class LanguageTranslator:
     """
     사용자가 입력한 언어를 AI가 잘 이해하는 영어로 바꾸거나,
     AI의 영어 답변을 사용자가 원하는 언어로 다시 번역해주는 클래스
     """
-    def __init__(self, model_name, base_url):
+    def __init__(self, model_name, base_url, cache=None, keep_alive=None):
         # 번역을 수행할 AI 모델의 이름과 접속 주소를 설정합니다.
-        self.llm = ChatOllama(model=model_name, base_url=base_url, temperature=0)
+        self.model_name = model_name
+        self.llm = ChatOllama(model=model_name, base_url=base_url, temperature=0, keep_alive=keep_alive)
+        self.cache = cache or TranslationCache()
+
+    @staticmethod
+    def _protect_code(text):
+        """코드 조각을 [[CODE_n]] 자리표시로 바꿔서, 모델에 보내지 않고 따로 보관합니다."""
+        blocks = []
+
+        def _replace(match):
+            blocks.append(match.group(0))
+            return PLACEHOLDER.format(len(blocks) - 1)
+
+        return CODE_PATTERN.sub(_replace, text), blocks
+
+    @staticmethod
+    def _restore_code(text, blocks):
+        """자리표시를 원래 코드 조각으로 되돌립니다."""
+        def _replace(match):
+            index = int(match.group(1))
+            return blocks[index] if index < len(blocks) else match.group(0)
 
-    def translate(self, text, target_lang, source_lang= "Auto"):
+        return PLACEHOLDER_PATTERN.sub(_replace, text)
+
+    def _prepare(self, text, target_lang, source_lang):
         """
-        입력받은 문장을 목표 언어로 번역하여 결과물로 돌려줍니다.
+        번역 전 준비: 코드 조각을 떼어내고, 번역이 필요 없거나 기억해 둔 결과가 있으면 바로 결과를 돌려줍니다.
+        (결과, None) 또는 (None, (캐시키, 보낼 글, 코드 조각들)) 을 돌려줍니다.
         """
+        prose, blocks = self._protect_code(text)
+        plain = PLACEHOLDER_PATTERN.sub("", prose)
+        detected = detect_language(plain)
+        if detected is None or detected == target_lang:
+            return text.strip(), None
+
+        key = TranslationCache.make_key(self.model_name, prose, source_lang, target_lang)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._restore_code(cached, blocks), None
+        return None, (key, prose, blocks)
+
+    def _chain(self):
         prompt = PromptTemplate(
             template="""You are a professional technical translator.
             Translate the following text from {source_lang} to {target_lang}.
             If it's a technical term or code, keep the meaning precise.
+            Keep every placeholder like [[CODE_0]] exactly as it is.
             Output ONLY the translated text without any explanation.
-        
+
             Text: {text}
 
             Translation:""",
             input_variables=["text", "source_lang", "target_lang"],
         )
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"text": text}, "source_lang": source_lang, "target_lang": target_lang).strip()
\ No newline at end of file
+        return prompt | self.llm | StrOutputParser()
+
+    def translate(self, text, target_lang, source_lang= "Auto", limiter= None):
+        """
+        입력받은 문장을 목표 언어로 번역하여 결과물로 돌려줍니다.
+        이미 목표 언어로 쓰인 글이거나 코드뿐인 글은 모델을 부르지 않고 그대로 돌려줍니다.
+        limiter를 넘기면 모델별 동시 요청 한도 안에서 번역합니다.
+        """
+        with span("translate", model=self.model_name, target_lang=target_lang, chars=len(text)) as s:
+            result, pending = self._prepare(text, target_lang, source_lang)
+            if pending is None:
+                # 번역이 필요 없었거나 기억해 둔 결과를 씀
+                s.set(cache_hit=True)
+                return result
+            key, prose, blocks = pending
+            inputs = {"text": prose, "source_lang": source_lang, "target_lang": target_lang}
+            if limiter is None:
+                translated = self._chain().invoke(inputs)
+            else:
+                with limiter.slot(self.model_name):
+                    translated = self._chain().invoke(inputs)
+            translated = translated.strip()
+            s.set(cache_hit=False, input_tokens=estimate_tokens(prose), output_tokens=estimate_tokens(translated))
+            self.cache.put(key, translated)
+            return self._restore_code(translated, blocks)
+
+    async def atranslate(self, text, target_lang, source_lang= "Auto", limiter= None):
+        """
+        translate 의 비동기 버전. limiter를 넘기면 모델별 동시 요청 한도 안에서 번역합니다.
+        """
+        with span("translate", model=self.model_name, target_lang=target_lang, chars=len(text)) as s:
+            result, pending = self._prepare(text, target_lang, source_lang)
+            if pending is None:
+                s.set(cache_hit=True)
+                return result
+            key, prose, blocks = pending
+            inputs = {"text": prose, "source_lang": source_lang, "target_lang": target_lang}
+            if limiter is None:
+                translated = await self._chain().ainvoke(inputs)
+            else:
+                async with limiter.aslot(self.model_name):
+                    translated = await self._chain().ainvoke(inputs)
+            translated = translated.strip()
+            s.set(cache_hit=False, input_tokens=estimate_tokens(prose), output_tokens=estimate_tokens(translated))
+            self.cache.put(key, translated)
+            return self._restore_code(translated, blocks)
+
+    def translate_stream(self, tokens, target_lang, source_lang= "Auto", limiter= None):
+        """
+        스트리밍으로 들어오는 영어 답변 토큰을 문장 단위로 모아서, 한 문장씩 번역해 돌려줍니다.
+        목표 언어가 영어라면 번역 없이 토큰을 그대로 흘려보냅니다.
+        ``` 코드 블록은 닫힐 때까지 모아서 통째로 내보냅니다.
+        """
+        if target_lang == "English":
+            yield from tokens
+            return
+
+        buffer = ""
+        for token in tokens:
+            buffer += token
+            while True:
+                cut = self._sentence_cut(buffer)
+                if cut is None:
+                    break
+                segment, buffer = buffer[:cut], buffer[cut:]
+                yield self._translate_segment(segment, target_lang, source_lang, limiter)
+        if buffer:
+            yield self._translate_segment(buffer, target_lang, source_lang, limiter)
+
+    @staticmethod
+    def _sentence_cut(buffer):
+        """번역해도 되는 완성된 문장이 있으면 그 끝 위치를, 없으면 None을 돌려줍니다."""
+        fence = buffer.find("```")
+        if fence == -1:
+            match = SENTENCE_END.search(buffer)
+            return match.end() if match else None
+        if fence > 0:
+            # 코드 블록 앞의 문장들은 먼저 내보냅니다.
+            match = SENTENCE_END.search(buffer, 0, fence)
+            return match.end() if match else fence
+        close = buffer.find("```", 3)
+        return None if close == -1 else close + 3
+
+    def _translate_segment(self, segment, target_lang, source_lang, limiter= None):
+        """문장 하나를 번역하되, 앞뒤 공백과 줄바꿈은 그대로 살립니다."""
+        stripped = segment.strip()
+        if not stripped:
+            return segment
+        head = segment[:len(segment) - len(segment.lstrip())]
+        tail = segment[len(segment.rstrip()):]
+        return head + self.translate(stripped, target_lang, source_lang, limiter) + tail